@@ -0,0 +1,126 @@
+# File: DijkstraBenchmark.py
+
+"""
+This program measures the running time of applyDijkstra on large
+synthetic graphs using each of the PriorityQueue backends and checks
+that every backend computes the same distances.  The arc costs are
+integers so that the BUCKET backend applies.  The graphs are a
+sparse random graph, copies of the sample graphs linked together to
+form a larger graph, and a dense random graph.  The size of the
+sparse graph can be given on the command line as the number of nodes
+followed by the number of arcs, as in
+
+    python DijkstraBenchmark.py 100000 1000000
+"""
+
+import gc
+import random
+import sys
+import time
+
+from graph import Graph
+from graphtools import readGraphData
+from dijkstra import applyDijkstra
+from pqueue import BINARY, LAZY, DARY, PAIRING, BUCKET
+
+BACKENDS = [ BINARY, LAZY, DARY, PAIRING, BUCKET ]
+SAMPLE_FILES = [ "AirlineGraph.txt", "MiddleEarth.txt" ]
+
+def createRandomGraph(nNodes, nArcs, seed=0):
+    """
+    Returns a graph with nNodes nodes and nArcs randomly chosen arcs
+    whose costs are integers between 1 and 100.  The first nNodes - 1
+    arcs form a chain through all the nodes so that every node is
+    reachable from the first one.
+    """
+    rand = random.Random(seed)
+    g = Graph()
+    nodes = [ g.addNode("N" + str(i)) for i in range(nNodes) ]
+    for i in range(1, nNodes):
+        g.addArc(nodes[i - 1], nodes[i]).setCost(rand.randint(1, 100))
+    for i in range(nArcs - (nNodes - 1)):
+        arc = g.addArc(nodes[rand.randrange(nNodes)],
+                       nodes[rand.randrange(nNodes)])
+        arc.setCost(rand.randint(1, 100))
+    return g, nodes[0]
+
+def createScaledGraph(filename, nCopies, seed=0):
+    """
+    Returns a graph made from nCopies copies of the graph in filename.
+    Each node is connected in both directions to the same node in the
+    next copy, and each copy has arcs to a few randomly chosen copies,
+    with costs drawn from the range of costs in the original graph.
+    """
+    rand = random.Random(seed)
+    sample = Graph()
+    readGraphData(sample, filename)
+    names = [ node.getName() for node in sample.getNodes() ]
+    arcs = [ (arc.getStart().getName(), arc.getFinish().getName(),
+              arc.getCost()) for arc in sample.getArcs() ]
+    low = int(min(cost for n1, n2, cost in arcs))
+    high = int(max(cost for n1, n2, cost in arcs))
+    g = Graph()
+    copies = [ { name: g.addNode(name + "_" + str(i)) for name in names }
+               for i in range(nCopies) ]
+    for copy in copies:
+        for n1, n2, cost in arcs:
+            g.addArc(copy[n1], copy[n2]).setCost(cost)
+    for i in range(nCopies):
+        for name in names:
+            if i + 1 < nCopies:
+                cost = rand.randint(low, high)
+                g.addArc(copies[i][name], copies[i + 1][name]).setCost(cost)
+                g.addArc(copies[i + 1][name], copies[i][name]).setCost(cost)
+            for k in range(2):
+                other = copies[rand.randrange(nCopies)][rand.choice(names)]
+                cost = rand.randint(low, high)
+                g.addArc(copies[i][name], other).setCost(cost)
+    return g, copies[0][names[0]]
+
+def timeFunction(fn):
+    """
+    Calls fn and returns the elapsed time in seconds.  As in the timeit
+    module, garbage collection is turned off while fn runs so that the
+    time does not depend on the objects left by earlier runs.
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+def benchmarkGraph(g, start):
+    """Prints the running time of applyDijkstra for each backend."""
+    print("Graph with " + str(len(g)) + " nodes and " +
+          str(len(g.getArcs())) + " arcs")
+    frozen = g.freeze()
+    expected = None
+    for backend in BACKENDS:
+        elapsed = timeFunction(lambda: applyDijkstra(g, start,
+                                                     backend=backend))
+        distances = [ node.distance for node in g.getNodes() ]
+        if expected is None:
+            expected = distances
+        elif distances != expected:
+            print("Distances differ for the " + backend + " backend")
+        frozenStart = frozen.indexOf(start)
+        frozenElapsed = timeFunction(lambda: applyDijkstra(frozen, frozenStart,
+                                                           backend=backend))
+        print("  " + backend.ljust(10) + "%6.2f sec" % elapsed +
+              "   CSRGraph %6.2f sec" % frozenElapsed)
+
+def DijkstraBenchmark(nNodes=100000, nArcs=1000000):
+    benchmarkGraph(*createRandomGraph(nNodes, nArcs))
+    for filename in SAMPLE_FILES:
+        print("Copies of " + filename)
+        benchmarkGraph(*createScaledGraph(filename, 5000))
+    print("Dense random graph")
+    benchmarkGraph(*createRandomGraph(5000, 1000000))
+
+# Startup code
+
+if __name__ == "__main__":
+    DijkstraBenchmark(*[ int(arg) for arg in sys.argv[1:] ])
@@ -5,59 +5,138 @@ This module extends the GraphConsoleTest program to test the
 implementation of Dijkstra's algorithm.
 """
 
+import math
+
 from graphtest import GraphConsoleTest
-from dijkstra import applyDijkstra
-from dijkstra import applyDijkstraOrig
+from geograph import GeoGraph
+from bellmanford import NegativeCycleError, spfa
+from contraction import createContractionHierarchy
+from contraction import loadContractionHierarchy, saveContractionHierarchy
+from dijkstra import applyAStar, applyDijkstraOrig
+from dijkstra import bidirectionalShortestPath, shortestPath
 
 class DijkstraTest(GraphConsoleTest):
 
     def __init__(self):
+        self.hierarchy = None
+        self.hierarchyVersion = None
         GraphConsoleTest.__init__(self)
 
+    def createGraph(self):
+        return GeoGraph()
+
     def distancesCommand(self, scanner):
         """distances start -- Compute distance to each node from start"""
         start = self.scanNode(scanner)
-        applyDijkstra(self.graph, start)
-        for node in sorted(self.graph.getNodes(), key=getDistance):
-            dstr = str(node.distance)
-            if dstr.endswith(".0"):
-                dstr = dstr[:-2]
-            print(str(node) + ": " + dstr)
+        distances, predecessors = shortestPath(self.graph, start)
+        for node in sorted(self.graph.getNodes(),
+                           key=lambda node: distances.get(node, math.inf)):
+            print(str(node) + ": " +
+                  formatDistance(distances.get(node, math.inf)))
+
+    def bellmanfordCommand(self, scanner):
+        """bellmanford start -- Compute distances allowing negative costs"""
+        start = self.scanNode(scanner)
+        try:
+            distances, predecessors = spfa(self.graph, start)
+        except NegativeCycleError as ex:
+            print(str(ex))
+            return
+        for node in sorted(self.graph.getNodes(),
+                           key=lambda node: distances.get(node, math.inf)):
+            print(str(node) + ": " +
+                  formatDistance(distances.get(node, math.inf)))
 
     def pathsCommand(self, scanner):
         """paths start -- Compute shortest path to each node from start"""
         start = self.scanNode(scanner)
         applyDijkstraOrig(self.graph, start)
         for node in sorted(self.graph.getNodes(), key=getDistance):
-            dstr = str(node.distance)
-            if dstr.endswith(".0"):
-                dstr = dstr[:-2]
-            print(getPath(node) + " (" + dstr + ")")
+            print(getPath(node) + " (" + formatDistance(node.distance) + ")")
 
-    #NEW CODE HERE
     def pathCommand(self, scanner):
         """path start finish -- Compute shortest path from start to finish"""
         start = self.scanNode(scanner)
         finish = self.scanNode(scanner)
+        distance, path = bidirectionalShortestPath(self.graph, start, finish)
+        if len(path) == 0:
+            print("No path from " + str(start) + " to " + str(finish))
+        else:
+            print("->".join(str(node) for node in path) +
+                  " (" + formatDistance(distance) + ")")
+
+    def astarCommand(self, scanner):
+        """astar start finish -- Compute shortest path using A* search"""
+        start = self.scanNode(scanner)
+        finish = self.scanNode(scanner)
+        distance, path = applyAStar(self.graph, start, finish,
+                                    checkAdmissible=True)
+        if len(path) == 0:
+            print("No path from " + str(start) + " to " + str(finish))
+        else:
+            print("->".join(str(node) for node in path) +
+                  " (" + formatDistance(distance) + ")")
 
-        applyDijkstra(self.graph, start, finish)
+    def contractCommand(self, scanner):
+        """contract -- Build a contraction hierarchy for the graph"""
+        self.hierarchy = createContractionHierarchy(self.graph)
+        self.hierarchyVersion = self.graph.getVersion()
+        print(str(self.hierarchy.getShortcutCount()) + " shortcuts added")
 
-        #for node in sorted(self.graph.getNodes(), key=getDistance):
-        #    print(getPath(node)  + "(" + str(node.distance) +")" )
+    def saveHierarchyCommand(self, scanner):
+        """saveHierarchy filename -- Save the contraction hierarchy"""
+        filename = self.scanFilenameToken(scanner, ".ch")
+        saveContractionHierarchy(self.getHierarchy(), filename)
 
-        """holddistance = finish.distance
-        holdpath = finish
-        for node in sorted(self.graph.getNodes(), key=getDistance):
-            if node.distance < holddistance:
-                holddistance = node.distance
-                holdpath = node"""
+    def loadHierarchyCommand(self, scanner):
+        """loadHierarchy filename -- Load a contraction hierarchy"""
+        filename = self.scanFilenameToken(scanner, ".ch")
+        hierarchy = loadContractionHierarchy(filename, self.graph)
+        names = sorted(node.getName() for node in hierarchy.getNodes())
+        if names != [ node.getName() for node in self.graph.getNodes() ]:
+            raise ValueError("Hierarchy in " + filename +
+                             " does not match the graph")
+        self.hierarchy = hierarchy
+        self.hierarchyVersion = self.graph.getVersion()
 
-        #The shortest path between the two is...
-        print(getPath(finish) + "(" + str(finish.distance) + ")")
+    def queryCommand(self, scanner):
+        """query start finish -- Compute shortest path using the hierarchy"""
+        start = self.scanNode(scanner)
+        finish = self.scanNode(scanner)
+        distance, path = self.getHierarchy().getPath(start, finish)
+        if len(path) == 0:
+            print("No path from " + str(start) + " to " + str(finish))
+        else:
+            print("->".join(str(node) for node in path) +
+                  " (" + formatDistance(distance) + ")")
+
+# Implementation notes: getHierarchy
+# ----------------------------------
+# A contraction hierarchy describes the graph as it was when the
+# hierarchy was built or loaded, so the test program records the
+# version of the graph at that time.  Any later change to the nodes
+# or arcs, including the clear and load commands, changes the version,
+# and getHierarchy then refuses to use the hierarchy rather than
+# answer queries about a graph that no longer exists.
+
+    def getHierarchy(self):
+        """Returns the contraction hierarchy, if one has been built."""
+        if self.hierarchy is None:
+            raise ValueError("No contraction hierarchy (use contract)")
+        if self.hierarchyVersion != self.graph.getVersion():
+            raise ValueError("The graph has changed since the contraction " +
+                             "hierarchy was built (use contract)")
+        return self.hierarchy
 
 def getDistance(node):
     return node.distance
 
+def formatDistance(distance):
+    dstr = str(distance)
+    if dstr.endswith(".0"):
+        dstr = dstr[:-2]
+    return dstr
+
 def getPath(node):
     if node.predecessor is None:
         return node.getName()
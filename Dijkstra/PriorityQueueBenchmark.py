@@ -0,0 +1,61 @@
+# File: PriorityQueueBenchmark.py
+
+"""
+This program measures the throughput of the enqueue, raisePriority,
+and dequeue methods for each PriorityQueue backend.  The number of
+items can be given on the command line, as in
+
+    python PriorityQueueBenchmark.py 1000000
+"""
+
+import random
+import sys
+import time
+
+from pqueue import PriorityQueue, BINARY, LAZY, DARY, PAIRING
+
+# Each backend is listed as a (label, backend, options) tuple.
+
+BACKENDS = [
+    ("binary", BINARY, { }),
+    ("lazy", LAZY, { }),
+    ("4-ary", DARY, { "arity": 4 }),
+    ("8-ary", DARY, { "arity": 8 }),
+    ("pairing", PAIRING, { }),
+]
+
+def PriorityQueueBenchmark(nItems=1000000):
+    rand = random.Random(0)
+    priorities = [ rand.random() for i in range(nItems) ]
+    raises = [ (rand.randrange(nItems), rand.random()) for i in range(nItems) ]
+    print("Benchmarking " + str(nItems) + " items")
+    for label, backend, options in BACKENDS:
+        pq = PriorityQueue(backend, **options)
+        current = list(priorities)
+        start = time.perf_counter()
+        for value in range(nItems):
+            pq.enqueue(value, priorities[value])
+        enqueueTime = time.perf_counter() - start
+        start = time.perf_counter()
+        for value, factor in raises:
+            current[value] *= factor
+            pq.raisePriority(value, current[value])
+        raiseTime = time.perf_counter() - start
+        start = time.perf_counter()
+        last = -1
+        while not pq.isEmpty():
+            priority = pq.peekPriority()
+            if priority < last:
+                print("Items dequeued out of order")
+            last = priority
+            pq.dequeue()
+        dequeueTime = time.perf_counter() - start
+        print(label.ljust(10) +
+              "enqueue %9d/sec  " % (nItems / enqueueTime) +
+              "raisePriority %9d/sec  " % (nItems / raiseTime) +
+              "dequeue %9d/sec" % (nItems / dequeueTime))
+
+# Startup code
+
+if __name__ == "__main__":
+    PriorityQueueBenchmark(*[ int(arg) for arg in sys.argv[1:] ])
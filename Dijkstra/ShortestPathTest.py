@@ -0,0 +1,169 @@
+# File: ShortestPathTest.py
+
+"""
+This program checks the shortest-path functions in the dijkstra module
+on small graphs whose correct answers are known.
+"""
+
+import math
+import os
+import tempfile
+
+from graph import CSRGraph, Graph
+from dijkstra import NEGATIVE_COST_MESSAGE, applyAStar, applyDijkstra
+from geograph import GeoGraph, euclidean, zeroHeuristic
+from graphtools import loadGraphSnapshot, saveGraphSnapshot
+
+# The early-exit graph is a list of (start, finish, cost) arcs.  A search
+# from S to F finishes before it reaches B through C, so the distance of
+# 10 recorded for B at that point is larger than its true distance of 4.
+
+EARLY_EXIT_ARCS = [ ("S", "A", 1), ("A", "F", 1), ("S", "B", 10),
+                    ("S", "C", 3), ("C", "B", 1) ]
+
+# The negative-cost graph contains an arc with a negative cost that a
+# search from S to F examines before it reaches F.
+
+NEGATIVE_COST_ARCS = [ ("S", "A", 1), ("A", "F", -1), ("S", "F", 2) ]
+
+# The snapshot graph has nodes with locations, given as a list of
+# (name, x, y) tuples, and arcs whose costs are at least the distance
+# between their endpoints.
+
+SNAPSHOT_LOCATIONS = [ ("S", 0, 0), ("A", 3, 4), ("B", 6, 0), ("F", 9, 4) ]
+SNAPSHOT_ARCS = [ ("S", "A", 5), ("A", "F", 6), ("S", "B", 6),
+                  ("B", "F", 5), ("A", "B", 5) ]
+
+# The large-cost graph has integer costs above 2**53, which a float
+# cannot represent exactly.
+
+LARGE_COST_ARCS = [ ("S", "A", 2**60 + 1), ("A", "F", 3) ]
+
+def createGraph(arcs, g=None):
+    """Returns a graph containing the arcs in the list."""
+    if g is None:
+        g = Graph()
+    for start, finish, cost in arcs:
+        for name in [ start, finish ]:
+            if g.findNode(name) is None:
+                g.addNode(name)
+        g.addArc(g.findNode(start), g.findNode(finish)).setCost(cost)
+    return g
+
+def checkEarlyExit():
+    """
+    Checks that applyDijkstra with a finish node leaves the nodes whose
+    distances were not finalized with an infinite distance.
+    """
+    g = createGraph(EARLY_EXIT_ARCS)
+    result = True
+    for graph in [ g, g.freeze() ]:
+        applyDijkstra(graph, graph.findNode("S"), graph.findNode("F"))
+        finish = graph.findNode("F")
+        unknown = graph.findNode("B")
+        if finish.distance != 2 or str(finish.predecessor) != "A":
+            result = False
+        if unknown.distance != math.inf or unknown.predecessor is not None:
+            result = False
+    return result
+
+def checkAStarNegativeCost():
+    """
+    Checks that applyAStar rejects an arc with a negative cost, whether
+    or not it checks that the heuristic is admissible.
+    """
+    g = createGraph(NEGATIVE_COST_ARCS)
+    result = True
+    for graph in [ g, g.freeze() ]:
+        for checkAdmissible in [ False, True ]:
+            try:
+                applyAStar(graph, graph.findNode("S"), graph.findNode("F"),
+                           heuristic=zeroHeuristic,
+                           checkAdmissible=checkAdmissible)
+                result = False
+            except ValueError as ex:
+                if str(ex) != NEGATIVE_COST_MESSAGE:
+                    result = False
+    return result
+
+def checkGeoSnapshot():
+    """
+    Checks that a GeoGraph saved as a snapshot keeps its node locations
+    when it is loaded into a GeoGraph or into a CSRGraph, so that A*
+    search with the euclidean heuristic finds the same path.
+    """
+    g = createGraph(SNAPSHOT_ARCS, GeoGraph())
+    for name, x, y in SNAPSHOT_LOCATIONS:
+        g.findNode(name).setLocation(x, y)
+    expected = findGeoPath(g)
+    result = True
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "geo.graph")
+        saveGraphSnapshot(g, filename)
+        copy = loadGraphSnapshot(filename, GeoGraph())
+        frozen = loadGraphSnapshot(filename, factory=GeoGraph)
+        for graph in [ copy, frozen ]:
+            for name, x, y in SNAPSHOT_LOCATIONS:
+                if graph.findNode(name).getLocation() != (x, y):
+                    result = False
+            if findGeoPath(graph) != expected:
+                result = False
+        # The CSRGraph keeps the file mapped until it is deleted.
+        del frozen
+    return result
+
+def findGeoPath(graph):
+    """
+    Returns the distance from S to F in the graph, which may be a
+    CSRGraph, along with the names of the nodes on the path.
+    """
+    start = graph.findNode("S")
+    finish = graph.findNode("F")
+    distance, path = applyAStar(graph, start, finish, heuristic=euclidean)
+    if isinstance(graph, CSRGraph):
+        path = [ graph.getNode(index) for index in path ]
+    return distance, [ node.getName() for node in path ]
+
+def checkIntegerCosts():
+    """
+    Checks that a CSRGraph whose costs are integers, whether it is
+    created by freeze or loaded from a snapshot, returns the costs and
+    distances as exact integers.
+    """
+    g = createGraph(LARGE_COST_ARCS)
+    expected = 2**60 + 4
+    result = True
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "large.graph")
+        saveGraphSnapshot(g, filename)
+        loaded = loadGraphSnapshot(filename)
+        for graph in [ g.freeze(), loaded ]:
+            costs = [ cost for finish, cost in graph.getArcsFrom(0) ]
+            if any(type(cost) is not int for cost in costs):
+                result = False
+            applyDijkstra(graph, "S")
+            distance = graph.findNode("F").distance
+            if type(distance) is not int or distance != expected:
+                result = False
+        # The CSRGraph keeps the file mapped until it is deleted.
+        del loaded, graph
+    return result
+
+CHECKS = [ checkEarlyExit, checkAStarNegativeCost, checkGeoSnapshot,
+           checkIntegerCosts ]
+
+def ShortestPathTest():
+    errorcount = 0
+    for check in CHECKS:
+        if not check():
+            errorcount += 1
+            print(check.__name__ + " failed")
+    if errorcount == 0:
+        print("ShortestPathTest succeeded")
+    else:
+        print("ShortestPathTest failed")
+
+# Startup code
+
+if __name__ == "__main__":
+    ShortestPathTest()
@@ -0,0 +1,447 @@
+# File: contraction.py
+
+"""
+This module implements contraction hierarchies, which answer repeated
+shortest-path queries on a graph that does not change.  Building the
+hierarchy is an expensive preprocessing step whose result can be saved
+to a file; each query afterward explores only a tiny part of the graph.
+"""
+
+from pqueue import PriorityQueue, LAZY
+from dijkstra import extractPath
+from graph import CSRGraph, Graph, Node
+import math
+import mmap
+import struct
+
+# Implementation notes: Contraction hierarchies
+# ---------------------------------------------
+# A contraction hierarchy assigns every node a rank and then removes
+# the nodes from the graph one at a time in order of increasing rank.
+# Removing, or contracting, a node v would break every shortest path
+# that runs u -> v -> w, so the contraction adds a shortcut arc from u
+# to w whose cost is the cost of that path, unless a witness search
+# finds a path from u to w that avoids v and is no longer.  The
+# shortcut records v as its middle node, which makes it possible to
+# expand it back into the original arcs later.
+#
+# Once every node has been contracted, every shortest path in the
+# original graph has a counterpart in the graph with shortcuts that
+# first climbs to higher ranks and then descends.  A query therefore
+# runs two Dijkstra searches that only climb: a forward search from
+# start over the upward arcs, which lead to nodes of higher rank, and
+# a backward search from finish over the downward arcs, which are the
+# arcs that enter a node from a node of higher rank.  The shortest path
+# is found at the node of highest rank on it, where the searches meet.
+# Each search can stop once its smallest priority is no less than the
+# best path found so far.  The searches also skip the arcs of any node
+# that is reached more cheaply through one of its neighbors of higher
+# rank, a technique called stall-on-demand, because the shortest path
+# cannot pass through such a node.
+#
+# The order in which nodes are contracted determines the number of
+# shortcuts and therefore the speed of the queries.  This implementation
+# uses the common heuristic that contracts first the nodes whose
+# contraction adds the fewest shortcuts compared with the number of
+# arcs it removes, adjusted by the number of neighbors that have
+# already been contracted and by the depth of the hierarchy beneath
+# the node, so that contractions spread evenly across the graph and
+# the hierarchy remains shallow.  Priorities are updated lazily: when
+# a node reaches the front of the queue, its priority is recomputed,
+# and it is put back if it is no longer the smallest.  The witness
+# searches give up after settling WITNESS_SEARCH_LIMIT nodes, which
+# may add a few unnecessary shortcuts but never produces a wrong
+# answer.
+
+WITNESS_SEARCH_LIMIT = 100
+
+class ContractionHierarchy:
+    """Defines a contraction hierarchy over the nodes of a graph."""
+
+    def __init__(self, nodes, ranks, up, down):
+        """
+        Creates a contraction hierarchy from a list of nodes, their
+        ranks, and two tuples containing the offsets, node indices,
+        costs, and middle nodes of the upward and downward arcs.  A
+        middle node of -1 indicates an arc of the original graph.
+        """
+        self._nodes = list(nodes)
+        self._index = None
+        self._ranks = ranks
+        self._up = up
+        self._down = down
+
+    def getNodes(self):
+        """Returns the list of nodes in the order of their indices."""
+        return list(self._nodes)
+
+    def getRank(self, node):
+        """Returns the rank of a node in the contraction order."""
+        return self._ranks[self.indexOf(node)]
+
+    def getShortcutCount(self):
+        """Returns the number of shortcut arcs added by the contraction."""
+        count = 0
+        for middles in [ self._up[3], self._down[3] ]:
+            for middle in middles:
+                if middle >= 0:
+                    count += 1
+        return count
+
+    def indexOf(self, arg):
+        """
+        Returns the index of a node, which can be specified as an
+        integer index, a Node object, or the name of the node.
+        """
+        if type(arg) is int:
+            if 0 <= arg < len(self._nodes):
+                return arg
+        else:
+            if isinstance(arg, Node):
+                arg = arg.getName()
+            if self._index is None:
+                self._index = { node.getName(): i
+                                for i, node in enumerate(self._nodes) }
+            index = self._index.get(arg)
+            if index is not None:
+                return index
+        raise ValueError("Illegal node specification")
+
+    def getDistance(self, start, finish):
+        """Returns the length of the shortest path from start to finish."""
+        return self._search(self.indexOf(start), self.indexOf(finish))[0]
+
+    def getPath(self, start, finish):
+        """
+        Returns a tuple containing the length of the shortest path from
+        start to finish and the list of nodes along that path.  If there
+        is no path, the length is infinite and the list is empty.
+        """
+        source = self.indexOf(start)
+        target = self.indexOf(finish)
+        best, meeting, predecessors = self._search(source, target)
+        if meeting is None:
+            return math.inf, [ ]
+        chain = extractPath(predecessors[0], meeting)
+        backward = extractPath(predecessors[1], meeting)
+        backward.reverse()
+        chain.extend(backward[1:])
+        path = [ source ]
+        for k in range(1, len(chain)):
+            self._unpack(chain[k - 1], chain[k], path)
+        return best, [ self._nodes[i] for i in path ]
+
+# Private methods
+
+    def _search(self, source, target):
+        """
+        Runs the bidirectional upward search and returns a tuple
+        containing the distance, the node at which the searches met,
+        and the predecessor dictionaries for the two searches.
+        """
+        arcs = (self._up, self._down)
+        distances = ({ source: 0 }, { target: 0 })
+        predecessors = ({ source: None }, { target: None })
+        finalized = (set(), set())
+        frontiers = (PriorityQueue(LAZY), PriorityQueue(LAZY))
+        frontiers[0].enqueue(source, 0)
+        frontiers[1].enqueue(target, 0)
+        best = 0 if source == target else math.inf
+        meeting = source if source == target else None
+        while True:
+            for side in [ 0, 1 ]:
+                frontier = frontiers[side]
+                if not frontier.isEmpty() and frontier.peekPriority() >= best:
+                    frontier.clear()
+            if frontiers[0].isEmpty() and frontiers[1].isEmpty():
+                break
+            side = 1 if frontiers[0].isEmpty() else 0
+            if side == 0 and not frontiers[1].isEmpty():
+                if frontiers[1].peekPriority() < frontiers[0].peekPriority():
+                    side = 1
+            node = frontiers[side].dequeue()
+            if node in finalized[side]:
+                continue
+            finalized[side].add(node)
+            known = distances[side]
+            other = distances[1 - side]
+            distance = known[node]
+            if node in other and distance + other[node] < best:
+                best = distance + other[node]
+                meeting = node
+            if self._isStalled(node, distance, known, arcs[1 - side]):
+                continue
+            offsets, targets, costs, middles = arcs[side]
+            for k in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[k]
+                newDistance = distance + costs[k]
+                if newDistance < known.get(neighbor, math.inf):
+                    known[neighbor] = newDistance
+                    predecessors[side][neighbor] = node
+                    frontiers[side].enqueue(neighbor, newDistance)
+        return best, meeting, predecessors
+
+    def _isStalled(self, node, distance, known, arcs):
+        """
+        Returns True if a node of higher rank that the search has
+        already reached offers a shorter path to node, which means that
+        the shortest path does not run through node and its arcs need
+        not be explored.  The arcs parameter contains the arcs that
+        lead into node from nodes of higher rank.
+        """
+        offsets, targets, costs, middles = arcs
+        for k in range(offsets[node], offsets[node + 1]):
+            if known.get(targets[k], math.inf) + costs[k] < distance:
+                return True
+        return False
+
+    def _unpack(self, u, w, path):
+        """Appends the original nodes on the arc from u to w to path."""
+        stack = [ (u, w) ]
+        while len(stack) > 0:
+            u, w = stack.pop()
+            middle = self._findMiddle(u, w)
+            if middle < 0:
+                path.append(w)
+            else:
+                stack.append((middle, w))
+                stack.append((u, middle))
+
+    def _findMiddle(self, u, w):
+        """Returns the middle node of the cheapest arc from u to w."""
+        if self._ranks[u] < self._ranks[w]:
+            offsets, targets, costs, middles = self._up
+            owner = u
+            other = w
+        else:
+            offsets, targets, costs, middles = self._down
+            owner = w
+            other = u
+        best = math.inf
+        middle = -1
+        for k in range(offsets[owner], offsets[owner + 1]):
+            if targets[k] == other and costs[k] < best:
+                best = costs[k]
+                middle = middles[k]
+        return middle
+
+# Overload standard methods
+
+    def __len__(self):
+        return len(self._nodes)
+
+def createContractionHierarchy(g):
+    """
+    Builds a contraction hierarchy for the graph g, which may be a
+    CSRGraph.  The costs of the arcs must not be negative.
+    """
+    if not isinstance(g, CSRGraph):
+        g = g.freeze()
+    n = len(g)
+    outArcs = [ { } for i in range(n) ]
+    inArcs = [ { } for i in range(n) ]
+    for v in range(n):
+        for w, cost in g.getArcsFrom(v):
+            if cost < 0:
+                raise ValueError("Contraction requires nonnegative costs")
+            if w != v and cost < outArcs[v].get(w, (math.inf,))[0]:
+                outArcs[v][w] = (cost, -1)
+                inArcs[w][v] = (cost, -1)
+    contracted = [ 0 ] * n
+    levels = [ 0 ] * n
+    queue = PriorityQueue(LAZY)
+    for v in range(n):
+        shortcuts = findShortcuts(outArcs, inArcs, v)
+        queue.enqueue(v, len(shortcuts) - len(outArcs[v]) - len(inArcs[v]))
+    ranks = [ 0 ] * n
+    upArcs = [ None ] * n
+    downArcs = [ None ] * n
+    rank = 0
+    while not queue.isEmpty():
+        v = queue.dequeue()
+        shortcuts = findShortcuts(outArcs, inArcs, v)
+        priority = (len(shortcuts) - len(outArcs[v]) - len(inArcs[v]) +
+                    contracted[v] + levels[v])
+        if not queue.isEmpty() and priority > queue.peekPriority():
+            queue.enqueue(v, priority)
+            continue
+        for u, w, cost in shortcuts:
+            if cost < outArcs[u].get(w, (math.inf,))[0]:
+                outArcs[u][w] = (cost, v)
+                inArcs[w][u] = (cost, v)
+        upArcs[v] = outArcs[v]
+        downArcs[v] = inArcs[v]
+        for w in outArcs[v]:
+            del inArcs[w][v]
+        for u in inArcs[v]:
+            del outArcs[u][v]
+        for u in set(outArcs[v]) | set(inArcs[v]):
+            contracted[u] += 1
+            levels[u] = max(levels[u], levels[v] + 1)
+        outArcs[v] = { }
+        inArcs[v] = { }
+        ranks[v] = rank
+        rank += 1
+    return ContractionHierarchy(g.getNodes(), ranks,
+                                createArcArrays(upArcs),
+                                createArcArrays(downArcs))
+
+def findShortcuts(outArcs, inArcs, v):
+    """
+    Returns a list of (u, w, cost) triples for the shortcuts that
+    contracting v would add to the remaining graph.
+    """
+    shortcuts = [ ]
+    for u, (inCost, middle) in inArcs[v].items():
+        targets = { }
+        for w, (outCost, middle) in outArcs[v].items():
+            if w != u:
+                targets[w] = inCost + outCost
+        if len(targets) == 0:
+            continue
+        distances = witnessSearch(outArcs, u, v, targets)
+        for w, cost in targets.items():
+            if distances.get(w, math.inf) > cost:
+                shortcuts.append((u, w, cost))
+    return shortcuts
+
+def witnessSearch(outArcs, source, excluded, targets):
+    """
+    Runs a limited Dijkstra search from source that avoids the node
+    excluded and returns a dictionary of the distances found.  The
+    search stops when it has settled every node in targets, when it
+    passes the largest cost in targets, or when it has settled
+    WITNESS_SEARCH_LIMIT nodes.
+    """
+    limit = max(targets.values())
+    remaining = len(targets)
+    distances = { source: 0 }
+    finalized = set()
+    frontier = PriorityQueue(LAZY)
+    frontier.enqueue(source, 0)
+    while not frontier.isEmpty() and len(finalized) < WITNESS_SEARCH_LIMIT:
+        node = frontier.dequeue()
+        if node in finalized:
+            continue
+        distance = distances[node]
+        if distance > limit:
+            break
+        finalized.add(node)
+        if node in targets:
+            remaining -= 1
+            if remaining == 0:
+                break
+        for w, (cost, middle) in outArcs[node].items():
+            if w != excluded:
+                newDistance = distance + cost
+                if newDistance < distances.get(w, math.inf):
+                    distances[w] = newDistance
+                    frontier.enqueue(w, newDistance)
+    return distances
+
+def createArcArrays(arcLists):
+    """
+    Converts a list that holds a dictionary of arcs for each node into
+    a tuple of offset, node, cost, and middle-node lists.
+    """
+    offsets = [ 0 ]
+    nodes = [ ]
+    costs = [ ]
+    middles = [ ]
+    for arcs in arcLists:
+        for w in sorted(arcs):
+            cost, middle = arcs[w]
+            nodes.append(w)
+            costs.append(cost)
+            middles.append(middle)
+        offsets.append(len(nodes))
+    return offsets, nodes, costs, middles
+
+# Implementation notes: Hierarchy files
+# -------------------------------------
+# A hierarchy file stores a contraction hierarchy in a binary form that
+# loads without any further computation.  Its layout follows that of a
+# graph snapshot.  The file begins with a header
+#
+#     magic     8 bytes   b"CONTRACT"
+#     version   4 bytes   HIERARCHY_VERSION
+#     marker    4 bytes   HIERARCHY_MARKER, to detect the byte order
+#     n         8 bytes   the number of nodes
+#     up        8 bytes   the number of upward arcs
+#     down      8 bytes   the number of downward arcs
+#     nameSize  8 bytes   the number of bytes of node names
+#
+# which is followed by the arrays nameOffsets and ranks, the offset,
+# node, cost, and middle arrays for the upward arcs and then for the
+# downward arcs, and finally the UTF-8 encoded node names.  The arrays
+# use 8-byte signed integers and 8-byte floating-point costs in the
+# native byte order and are used directly from the memory-mapped file.
+
+HIERARCHY_MAGIC = b"CONTRACT"
+HIERARCHY_VERSION = 1
+HIERARCHY_MARKER = 0x01020304
+HIERARCHY_HEADER = "=8sII4q"
+
+def saveContractionHierarchy(ch, filename):
+    """Writes the contraction hierarchy ch to a file."""
+    names = [ node.getName().encode("utf-8") for node in ch._nodes ]
+    nameOffsets = [ 0 ]
+    for name in names:
+        nameOffsets.append(nameOffsets[-1] + len(name))
+    n = len(ch)
+    with open(filename, "wb") as f:
+        f.write(struct.pack(HIERARCHY_HEADER, HIERARCHY_MAGIC,
+                            HIERARCHY_VERSION, HIERARCHY_MARKER, n,
+                            len(ch._up[1]), len(ch._down[1]), nameOffsets[-1]))
+        f.write(struct.pack(str(n + 1) + "q", *nameOffsets))
+        f.write(struct.pack(str(n) + "q", *ch._ranks))
+        for offsets, nodes, costs, middles in [ ch._up, ch._down ]:
+            f.write(struct.pack(str(len(offsets)) + "q", *offsets))
+            f.write(struct.pack(str(len(nodes)) + "q", *nodes))
+            f.write(struct.pack(str(len(costs)) + "d", *costs))
+            f.write(struct.pack(str(len(middles)) + "q", *middles))
+        f.write(b"".join(names))
+
+def loadContractionHierarchy(filename, g=None):
+    """
+    Reads a contraction hierarchy from a file.  If g is specified,
+    the hierarchy uses the nodes of g that have the same names;
+    otherwise, it creates new nodes.
+    """
+    with open(filename, "rb") as f:
+        data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    header = struct.calcsize(HIERARCHY_HEADER)
+    magic, version, marker, n, nUp, nDown, nameSize = \
+        struct.unpack(HIERARCHY_HEADER, data[:header])
+    if magic != HIERARCHY_MAGIC or version != HIERARCHY_VERSION:
+        raise ValueError("Not a contraction hierarchy: " + filename)
+    if marker != HIERARCHY_MARKER:
+        raise ValueError("Hierarchy has the wrong byte order: " + filename)
+    arrays = [ ]
+    p = header
+    for typecode, count in [ ("q", n + 1), ("q", n),
+                             ("q", n + 1), ("q", nUp), ("d", nUp), ("q", nUp),
+                             ("q", n + 1), ("q", nDown), ("d", nDown),
+                             ("q", nDown) ]:
+        arrays.append(data[p:p + 8 * count].cast(typecode))
+        p += 8 * count
+    nameOffsets = arrays[0]
+    nameData = bytes(data[p:p + nameSize])
+    factory = Graph() if g is None else g
+    nodes = [ ]
+    for i in range(n):
+        name = nameData[nameOffsets[i]:nameOffsets[i + 1]].decode("utf-8")
+        node = None if g is None else g.findNode(name)
+        if node is None:
+            node = factory.createNode(name)
+        nodes.append(node)
+    return ContractionHierarchy(nodes, arrays[1], tuple(arrays[2:6]),
+                                tuple(arrays[6:10]))
+
+def isContractionHierarchy(filename):
+    """Returns True if the file begins with the hierarchy magic number."""
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(HIERARCHY_MAGIC)) == HIERARCHY_MAGIC
+    except OSError:
+        return False
@@ -9,19 +9,29 @@ shortest-path problem.
 #Worked a bit with Casey Harris and Jirarong Li
 # -Hannah
 
-from pqueue import PriorityQueue
+from pqueue import PriorityQueue, BUCKET, LAZY
+from graph import CSRGraph
+from geograph import euclidean
 import math
 
+# Constants
+
+AUTO = "auto"
+NEGATIVE_COST_MESSAGE = ("Dijkstra's algorithm requires nonnegative costs " +
+                         "(use bellmanFord instead)")
+
 # Implementation notes
 # --------------------
-# This implementation of Dijkstra's algorithm follows the logic of the
-# pseudocode from CLRS and computes the minimum distance from the start
-# node to every other node in the graph.  Unlike Dijkstra's original
-# algorithm, it does not support stopping when a destination node is
-# reached or visiting only a subset of the nodes.  It also uses an
-# implementation of the PriorityQueue class that does not guarantee
-# the logarithmic time performance of the raisePriority method.  Your
-# job on the assignment is to repair these deficiencies.
+# The applyDijkstraOrig function is the original version of Dijkstra's
+# algorithm, which follows the pseudocode from CLRS: it puts every node
+# in the queue at the start, computes the distance to every node, and
+# uses raisePriorityOrig, which searches the queue in linear time.  It
+# is kept for comparison.  The applyDijkstra and shortestPath functions
+# start with only the start node in the queue, so they visit only the
+# nodes that can be reached, and they stop as soon as the distance to
+# an optional finish node is known.  They update the frontier with the
+# raisePriority method, which runs in O(log N) time for the heap-based
+# backends in pqueue.py, so a complete search takes O(E log V) time.
 
 def applyDijkstraOrig(g, start):
     """
@@ -46,56 +56,333 @@ def applyDijkstraOrig(g, start):
                     pq.raisePriorityOrig(n2, n2.distance)
 
 
-def applyDijkstra(g, start, finish):
+def applyDijkstra(g, start, finish=None, backend=LAZY):
     """
     Applies Dijkstra's algorithm to the graph g, updating the
-    distance from start to each node in g.
+    distance from start to each node in g.  If finish is specified,
+    the search stops once the distance to finish is known, and nodes
+    whose distance has not been determined have an infinite distance.
+    The backend argument selects the PriorityQueue representation.
     """
-    #MAKE SURE THAT THE ALGORITHM IS APPLIED ONLY TO THE START/FINISH NODE
-    #USE node.predecessor, node.distance
-    
-    #initializeSingleSource(g, start)
-
-    finalized = set()
-    frontier = PriorityQueue()
-    finishedendnode = False
-    #explored = set()
-    start.distance = 0
-    start.predecessor = None
+    distances, predecessors = shortestPath(g, start, finish, backend)
+    if isinstance(g, CSRGraph):
+        nodes = g.getNodes()
+        for i in range(len(nodes)):
+            nodes[i].distance = distances.get(i, math.inf)
+            predecessor = predecessors.get(i)
+            if predecessor is None:
+                nodes[i].predecessor = None
+            else:
+                nodes[i].predecessor = nodes[predecessor]
+    else:
+        for node in g.getNodes():
+            node.distance = distances.get(node, math.inf)
+            node.predecessor = predecessors.get(node)
 
-    frontier.enqueue(start)
+# Implementation notes: shortestPath
+# ----------------------------------
+# The shortestPath function keeps the state of a query in two
+# dictionaries that are created for each call, rather than in
+# attributes of the nodes.  Each query therefore starts from a clean
+# slate, touches only the nodes that the search reaches, and leaves
+# the graph unchanged, so that it is safe to call shortestPath many
+# times on the same graph.  Whenever the distance to a node in the
+# frontier improves, the search calls raisePriority, which the BINARY
+# backend implements by moving the entry toward the root of the heap
+# and the LAZY backend implements by adding a new entry and skipping
+# the old one when it reaches the front.  The LAZY backend is the
+# default because it is faster, as measured by DijkstraBenchmark.py.
+# The search ends as soon as finish is dequeued, because its distance
+# cannot improve after that point.  Because that argument fails when
+# an arc has a negative cost, shortestPath raises a ValueError if it
+# encounters such an arc rather than returning distances that may be
+# wrong; the bellmanford module handles those graphs.  The two
+# dictionaries contain an entry for every node whose distance is
+# known, and the distance to any other node is infinite.  If the
+# search stops early at finish, the nodes still in the frontier are
+# left out, because their distances are only upper bounds that a
+# longer search might reduce.  When g is a CSRGraph, the
+# nodes are represented by their integer indices.  If backend is AUTO,
+# shortestPath calls selectBackend to choose the queue, which picks the
+# BUCKET backend when every arc cost is a nonnegative integer.  In that
+# case, a search whose costs are at most C runs in O(E + V * C) time,
+# because the queue advances through each possible distance at most
+# once and performs every other operation in constant time.  Checking
+# the costs takes O(E) time, which is why AUTO is not the default for
+# queries that stop early at finish.
 
-    while not frontier.isEmpty() and finishedendnode == False:
+def shortestPath(g, start, finish=None, backend=LAZY):
+    """
+    Runs Dijkstra's algorithm from start and returns a tuple of two
+    dictionaries, the first mapping each node whose distance is known
+    to its distance from start and the second mapping it to its
+    predecessor on the shortest path, which is None for start itself.
+    If finish is specified, the search stops as soon as its distance
+    is known.
+    The backend argument selects the PriorityQueue representation,
+    and the value AUTO chooses one based on the arc costs.
+    """
+    if backend == AUTO:
+        backend = selectBackend(g)
+    if isinstance(g, CSRGraph):
+        return shortestPathCSR(g, start, finish, backend)
+    distances = { start: 0 }
+    predecessors = { start: None }
+    finalized = set()
+    frontier = PriorityQueue(backend)
+    frontier.enqueue(start, 0)
+    while not frontier.isEmpty():
         node = frontier.dequeue()
-        #print(type(node))
         finalized.add(node)
-        if node == finish:
-            finishedendnode = True
-            break
+        if node is finish:
+            return selectFinalized(distances, predecessors, finalized)
+        distance = distances[node]
         for arc in node.getArcsFrom():
-            n1 = arc.getStart()
-            n2 = arc.getFinish()
-            #print("n1: "+ str(n1))
-            #print("n2: "+ str(n2))
-            #print("node: "+ str(node))
-            if n2 not in finalized:
-                #print("n2: "+ str(n2))
-                if n2 not in frontier:
-                    initIndivNode(n1, n2, arc)
-                    frontier.enqueue(n2, n2.distance)
-                #init single source
-                else:
-                    oldDistance = n2.distance
-                    relax(n1, n2, arc.getCost())
-                    if n2.distance < oldDistance:
-                        frontier.raisePriority(n2, n2.distance)
+            neighbor = arc.getFinish()
+            cost = arc.getCost()
+            if cost < 0:
+                raise ValueError(NEGATIVE_COST_MESSAGE)
+            if neighbor not in finalized:
+                newDistance = distance + cost
+                if newDistance < distances.get(neighbor, math.inf):
+                    distances[neighbor] = newDistance
+                    predecessors[neighbor] = node
+                    if neighbor in frontier:
+                        frontier.raisePriority(neighbor, newDistance)
+                    else:
+                        frontier.enqueue(neighbor, newDistance)
+    return distances, predecessors
+
+def shortestPathCSR(g, start, finish=None, backend=LAZY):
+    """
+    Implements shortestPath for a CSRGraph, in which the nodes are
+    specified and returned as integer indices.
+    """
+    offsets = g.getOffsets()
+    targets = g.getTargets()
+    costs = g.getCosts()
+    source = g.indexOf(start)
+    target = -1 if finish is None else g.indexOf(finish)
+    distances = { source: 0 }
+    predecessors = { source: None }
+    finalized = set()
+    frontier = PriorityQueue(backend)
+    frontier.enqueue(source, 0)
+    while not frontier.isEmpty():
+        index = frontier.dequeue()
+        finalized.add(index)
+        if index == target:
+            return selectFinalized(distances, predecessors, finalized)
+        distance = distances[index]
+        for k in range(offsets[index], offsets[index + 1]):
+            neighbor = targets[k]
+            cost = costs[k]
+            if cost < 0:
+                raise ValueError(NEGATIVE_COST_MESSAGE)
+            if neighbor not in finalized:
+                newDistance = distance + cost
+                if newDistance < distances.get(neighbor, math.inf):
+                    distances[neighbor] = newDistance
+                    predecessors[neighbor] = index
+                    if neighbor in frontier:
+                        frontier.raisePriority(neighbor, newDistance)
+                    else:
+                        frontier.enqueue(neighbor, newDistance)
+    return distances, predecessors
 
+def selectFinalized(distances, predecessors, finalized):
+    """
+    Returns the entries in the distances and predecessors dictionaries
+    for the nodes in the finalized set.
+    """
+    return ({ node: distances[node] for node in finalized },
+            { node: predecessors[node] for node in finalized })
+
+def selectBackend(g):
+    """
+    Returns BUCKET if every arc cost in g is a nonnegative integer,
+    which can be stored as an int or as a float, and LAZY otherwise.
+    """
+    if isinstance(g, CSRGraph):
+        costs = g.getCosts()
+    else:
+        costs = [ arc.getCost() for arc in g.getArcs() ]
+    for cost in costs:
+        if not (cost >= 0 and float(cost).is_integer()):
+            return LAZY
+    return BUCKET
 
+def extractPath(predecessors, finish):
+    """
+    Returns the list of nodes on the shortest path ending at finish,
+    using the predecessors dictionary returned by shortestPath.  If
+    finish was not reached, extractPath returns an empty list.
+    """
+    if finish not in predecessors:
+        return [ ]
+    path = [ ]
+    node = finish
+    while node is not None:
+        path.append(node)
+        node = predecessors[node]
+    path.reverse()
+    return path
+
+# Implementation notes: bidirectionalShortestPath
+# -----------------------------------------------
+# The bidirectional search runs Dijkstra's algorithm forward from start
+# over the arcs leaving each node and backward from finish over the arcs
+# entering each node, always advancing the search with the smaller
+# frontier.  Whenever either search relaxes an arc into a node that the
+# other search has reached, the two partial paths form a complete path,
+# and the length of the shortest such path is kept in best.  Once the
+# smallest priorities in the two frontiers add up to at least best, no
+# path through an unsettled node can be shorter, and the search stops.
+# Each search covers a disk whose radius is about half the distance
+# between the endpoints, which settles far fewer nodes than a single
+# search on graphs that spread out like road networks.  The rule that
+# ends the search is correct even though the frontiers may contain
+# stale entries, because those entries only make the sum smaller.
+
+def bidirectionalShortestPath(g, start, finish):
+    """
+    Returns a tuple containing the length of the shortest path from
+    start to finish and the list of nodes along that path.  If there
+    is no path, the length is infinite and the list is empty.  When g
+    is a CSRGraph, the nodes are represented by their integer indices.
+    """
+    if isinstance(g, CSRGraph):
+        start = g.indexOf(start)
+        finish = g.indexOf(finish)
+        neighbors = (g.getArcsFrom, g.getArcsTo)
+    else:
+        neighbors = (getSuccessors, getPredecessors)
+    if start == finish:
+        return 0, [ start ]
+    distances = ({ start: 0 }, { finish: 0 })
+    predecessors = ({ start: None }, { finish: None })
+    finalized = (set(), set())
+    frontiers = (PriorityQueue(LAZY), PriorityQueue(LAZY))
+    frontiers[0].enqueue(start, 0)
+    frontiers[1].enqueue(finish, 0)
+    best = math.inf
+    meeting = None
+    while not frontiers[0].isEmpty() and not frontiers[1].isEmpty():
+        if frontiers[0].peekPriority() + frontiers[1].peekPriority() >= best:
+            break
+        side = 0 if frontiers[0].size() <= frontiers[1].size() else 1
+        node = frontiers[side].dequeue()
+        if node in finalized[side]:
+            continue
+        finalized[side].add(node)
+        known = distances[side]
+        other = distances[1 - side]
+        distance = known[node]
+        for neighbor, cost in neighbors[side](node):
+            if cost < 0:
+                raise ValueError(NEGATIVE_COST_MESSAGE)
+            if neighbor in finalized[side]:
+                continue
+            newDistance = distance + cost
+            if newDistance < known.get(neighbor, math.inf):
+                known[neighbor] = newDistance
+                predecessors[side][neighbor] = node
+                frontiers[side].enqueue(neighbor, newDistance)
+            if neighbor in other and known[neighbor] + other[neighbor] < best:
+                best = known[neighbor] + other[neighbor]
+                meeting = neighbor
+    if meeting is None:
+        return math.inf, [ ]
+    path = extractPath(predecessors[0], meeting)
+    node = predecessors[1][meeting]
+    while node is not None:
+        path.append(node)
+        node = predecessors[1][node]
+    return best, path
+
+# Implementation notes: applyAStar
+# --------------------------------
+# A* search is Dijkstra's algorithm with the priority of each node
+# increased by an estimate of the remaining distance to finish, which
+# draws the search toward finish instead of letting it spread out in
+# every direction.  The estimates come from the heuristic function,
+# which is called at most once for each node.  The frontier uses
+# raisePriority when a node already in the queue finds a shorter path.
+# If a node that has already left the queue finds a shorter path, which
+# can happen only if the heuristic is inconsistent, it is enqueued
+# again, so the result is still correct for any heuristic that never
+# overestimates.  If checkAdmissible is True, applyAStar also checks
+# that the estimate for finish is 0 and that the estimate never drops
+# by more than the cost of an arc that the search examines.  Those
+# conditions make the heuristic consistent, which guarantees that it
+# never overestimates, and applyAStar raises a ValueError identifying
+# the arc on which they fail.  Like shortestPath, applyAStar raises a
+# ValueError if it encounters an arc with a negative cost.
+
+def applyAStar(g, start, finish, heuristic=euclidean, checkAdmissible=False):
+    """
+    Uses A* search guided by heuristic to find the shortest path from
+    start to finish.  The function returns a tuple containing the
+    length of the path and the list of nodes along it; if there is no
+    path, the length is infinite and the list is empty.  When g is a
+    CSRGraph, the nodes are represented by their integer indices.
+    """
+    if isinstance(g, CSRGraph):
+        start = g.indexOf(start)
+        finish = g.indexOf(finish)
+        neighbors = g.getArcsFrom
+        getNode = g.getNode
+    else:
+        neighbors = getSuccessors
+        getNode = None
+    target = finish if getNode is None else getNode(finish)
+    def estimate(node):
+        if getNode is not None:
+            node = getNode(node)
+        return heuristic(node, target)
+    estimates = { start: estimate(start), finish: estimate(finish) }
+    if checkAdmissible and estimates[finish] != 0:
+        raise ValueError("Heuristic is nonzero at " + str(target))
+    distances = { start: 0 }
+    predecessors = { start: None }
+    frontier = PriorityQueue(LAZY)
+    frontier.enqueue(start, estimates[start])
+    while not frontier.isEmpty():
+        node = frontier.dequeue()
+        if node == finish:
+            return distances[finish], extractPath(predecessors, finish)
+        distance = distances[node]
+        for neighbor, cost in neighbors(node):
+            if cost < 0:
+                raise ValueError(NEGATIVE_COST_MESSAGE)
+            if neighbor not in estimates:
+                estimates[neighbor] = estimate(neighbor)
+            if checkAdmissible:
+                bound = cost + estimates[neighbor]
+                if (estimates[node] > bound and
+                        not math.isclose(estimates[node], bound)):
+                    n1 = node if getNode is None else getNode(node)
+                    n2 = neighbor if getNode is None else getNode(neighbor)
+                    raise ValueError("Heuristic is not admissible on arc " +
+                                     str(n1) + " -> " + str(n2))
+            newDistance = distance + cost
+            if newDistance < distances.get(neighbor, math.inf):
+                distances[neighbor] = newDistance
+                predecessors[neighbor] = node
+                priority = newDistance + estimates[neighbor]
+                if neighbor in frontier:
+                    frontier.raisePriority(neighbor, priority)
+                else:
+                    frontier.enqueue(neighbor, priority)
+    return math.inf, [ ]
 
-def initIndivNode(n1,n2,arc):
-    n2.distance = n1.distance + arc.getCost()
-    n2.predecessor = n1
+def getSuccessors(node):
+    """Returns a list of (finish, cost) pairs for the arcs leaving node."""
+    return [ (arc.getFinish(), arc.getCost()) for arc in node.getArcsFrom() ]
 
+def getPredecessors(node):
+    """Returns a list of (start, cost) pairs for the arcs entering node."""
+    return [ (arc.getStart(), arc.getCost()) for arc in node.getArcsTo() ]
 
 def initializeSingleSource(g, start):
     """Initialize the distance and predecessor attributes."""
@@ -0,0 +1,95 @@
+# File: geograph.py
+
+"""
+This module defines the classes GeoGraph and GeoNode, which extend
+the Graph and Node classes so that each node can have a location in
+the plane, along with the heuristic functions used by A* search.
+"""
+
+from graph import Graph, Node
+import math
+
+class GeoGraph(Graph):
+    """Defines a graph whose nodes are GeoNode objects."""
+
+    def createNode(self, name):
+        """Returns a GeoNode with the specified name."""
+        return GeoNode(name)
+
+# Implementation notes: GeoNode class
+# -----------------------------------
+# The GeoNode class adds an optional location to a node.  In a graph
+# file, the location appears as the options string on a line that
+# defines a node, as in
+#
+#     ATL (725, 408)
+#
+# The scanOptions method reads the two coordinates, and formatOptions
+# writes them back out in the same form so that the locations survive
+# being saved in a snapshot.  Nodes that are not given a location have
+# the location None.
+
+class GeoNode(Node):
+    """This class defines a node that has a location."""
+
+    def __init__(self, name):
+        """Creates a node with the given name and no location."""
+        Node.__init__(self, name)
+        self._location = None
+
+    def getLocation(self):
+        """Returns the location of this node as an (x, y) tuple, or None."""
+        return self._location
+
+    def setLocation(self, x, y):
+        """Sets the location of this node."""
+        self._location = (x, y)
+
+    def scanOptions(self, options):
+        """Scans an options string of the form x, y as the location."""
+        coordinates = options.split(",")
+        if len(coordinates) != 2:
+            raise ValueError("Illegal location: " + options)
+        self.setLocation(float(coordinates[0]), float(coordinates[1]))
+
+    def formatOptions(self):
+        """Returns the location as an options string, or None."""
+        if self._location is None:
+            return None
+        return ", ".join(formatCoordinate(c) for c in self._location)
+
+def formatCoordinate(c):
+    """Converts a coordinate to a string, omitting a trailing .0."""
+    s = str(c)
+    if s.endswith(".0"):
+        s = s[:-2]
+    return s
+
+# Implementation notes: Heuristic functions
+# -----------------------------------------
+# A heuristic function takes two nodes and returns an estimate of the
+# cost of the shortest path between them.  A* search finds shortest
+# paths as long as the estimate never exceeds the actual cost, which
+# is true of the straight-line distance whenever the cost of each arc
+# is at least the distance between its endpoints.  Nodes without a
+# location have an estimate of 0, which never overestimates.
+
+def euclidean(n1, n2):
+    """Returns the straight-line distance between two nodes."""
+    p1 = n1.getLocation()
+    p2 = n2.getLocation()
+    if p1 is None or p2 is None:
+        return 0
+    return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
+
+def manhattan(n1, n2):
+    """Returns the distance between two nodes along the axes."""
+    p1 = n1.getLocation()
+    p2 = n2.getLocation()
+    if p1 is None or p2 is None:
+        return 0
+    return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
+
+def zeroHeuristic(n1, n2):
+    """Returns 0, which makes A* search equivalent to Dijkstra's algorithm."""
+    return 0
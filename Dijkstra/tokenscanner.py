@@ -23,10 +23,23 @@ model that is shared across a variety of languages.
 #        token = scanner.nextToken()
 #        . . . process the token . . .
 #
+# Alternatively, clients can iterate over the scanner, which produces
+# a tuple containing the token, its type, and its starting position:
+#
+#    for token, type, position in TokenScanner(s):
+#        . . . process the token . . .
+#
+# The input can also be a file, which the scanner reads in large chunks
+# so that arbitrarily long files can be scanned in bounded memory.
+# The optional chunkSize argument to the constructor sets the number of
+# characters read at a time.
+#
 # The TokenScanner class exports several additional methods that give
 # clients more control over its behavior.  Those methods are described
 # individually in the documentation.
 
+import re
+
 class TokenScanner:
 
 # Public constants
@@ -50,16 +63,20 @@ class TokenScanner:
     _LEADING_ZERO = 6
     _SCANNING_HEX = 7
     _FINAL_STATE = 8
+    DEFAULT_CHUNK_SIZE = 65536
 
 # Constructor
 
-    def __init__(self, input=""):
+    def __init__(self, input="", chunkSize=DEFAULT_CHUNK_SIZE):
         self._ignoreWhitespaceFlag = False
         self._ignoreCommentsFlag = False
         self._scanNumbersFlag = False
         self._scanStringsFlag = False
         self._operators = set()
         self._wordChars = ""
+        self._regexFlag = False
+        self._pattern = None
+        self._chunkSize = chunkSize
         self.setInput(input)
 
 # Sets the scanner input to the specified string or file.  Any previous
@@ -69,6 +86,8 @@ class TokenScanner:
         self._savedTokens = [ ]
         self._savedCharacters = [ ]
         self._cp = 0
+        self._rp = 0
+        self._base = 0
         if type(input) is str:
             self._file = None
             self._buffer = input
@@ -89,45 +108,16 @@ class TokenScanner:
     def nextToken(self):
         if len(self._savedTokens) != 0:
             return self._savedTokens.pop()
-        while True:
-            if self._ignoreWhitespaceFlag:
-                self.skipSpaces()
-            ch = self.getChar()
-            if ch == "":
-                return ""
-            if ch == "/" and self._ignoreCommentsFlag:
-                ch = self.getChar()
-                if ch == "/":
-                    ch = self.getChar()
-                    while ch != "\n" and ch != "\r" and ch != "":
-                        ch = self.getChar()
-                    continue
-                elif ch == "*":
-                    prev = ""
-                    while ch != "" and not(prev == "*" and ch == "/"):
-                        prev = ch
-                        ch = self.getChar()
-                    continue
-                self.saveChar(ch)
-                ch = "/"
-            if (ch == "'" or ch == "\"") and self._scanStringsFlag:
-                self.saveChar(ch)
-                return self.scanString()
-            if ch.isdigit() and self._scanNumbersFlag:
-                self.saveChar(ch)
-                return self.scanNumber()
-            if self.isWordCharacter(ch):
-                self.saveChar(ch)
-                return self.scanWord()
-            op = ch
-            while self.isOperatorPrefix(op):
-                ch = self.getChar()
-                if ch == "": break
-                op += ch
-            while len(op) > 1 and not self.isOperator(op):
-                self.saveChar(op[-1])
-                op = op[0:-1]
-            return op
+        if self._regexFlag:
+            if len(self._savedCharacters) == 0:
+                token = self.matchToken()
+                if token is not None:
+                    return token
+            self.syncCharacters()
+            token = self.scanToken()
+            self._rp = self._cp
+            return token
+        return self.scanToken()
 
 # Saves one token to reread later.
 
@@ -151,6 +141,7 @@ class TokenScanner:
 
     def ignoreWhitespace(self):
         self._ignoreWhitespaceFlag = True
+        self._pattern = None
 
 # Tells the scanner to ignore comments.  The scanner package recognizes
 # both the slash-star and slash-slash comment format from the C-based
@@ -162,6 +153,7 @@ class TokenScanner:
 
     def ignoreComments(self):
         self._ignoreCommentsFlag = True
+        self._pattern = None
 
 # Controls how the scanner treats tokens that begin with a digit.  By
 # default, the nextToken method treats numbers and letters identically
@@ -175,6 +167,7 @@ class TokenScanner:
 
     def scanNumbers(self):
         self._scanNumbersFlag = True
+        self._pattern = None
 
 # Controls how the scanner treats tokens enclosed in quotation marks.  By
 # default, quotation marks (either single or double) are treated just like
@@ -189,6 +182,7 @@ class TokenScanner:
 
     def scanStrings(self):
         self._scanStringsFlag = True
+        self._pattern = None
 
 # Adds the characters in chars to the set of characters that are acceptable
 # in an identifier.  For example, calling addWordCharacters("_") adds the
@@ -196,6 +190,7 @@ class TokenScanner:
 
     def addWordCharacters(self, chars):
         self._wordChars += chars
+        self._pattern = None
 
 # Defines a new multicharacter operator.  Whenever you call nextToken
 # when the input stream contains operator characters, the scanner returns
@@ -203,18 +198,34 @@ class TokenScanner:
 
     def addOperator(self, op):
         self._operators.add(op)
+        self._pattern = None
+
+# Tells the scanner to read tokens using a regular expression compiled
+# from its configuration instead of reading one character at a time.
+# Calling
+#
+#     scanner.useRegularExpressions()
+#
+# does not change the tokens, their types, or the positions reported by
+# getPosition, but makes nextToken considerably faster on string input.
+# The regular expression is rebuilt automatically if the configuration
+# changes later.
+
+    def useRegularExpressions(self):
+        self._regexFlag = True
 
-# Returns the current position of the scanner in the self._buffer stream.
-# If saveToken has been called, this position corresponds to the
-# beginning of the saved token.  If saveToken is called more than
-# once, the position is unavailable.
+# Returns the current position of the scanner as the number of characters
+# read from the beginning of the input, which may be a file.  If
+# saveToken has been called, this position corresponds to the beginning
+# of the saved token.  If saveToken is called more than once, the
+# position is unavailable.
 
     def getPosition(self):
         nTokens = len(self._savedTokens)
         if nTokens == 0:
-            return self._cp
-        elif nToken == 1:
-            return self._cp - len(self._savedTokens[0])
+            return self._base + self._cp
+        elif nTokens == 1:
+            return self._base + self._cp - len(self._savedTokens[0])
         else:
             raise ScannerError("Internal error: getPosition after two saves")
 
@@ -274,6 +285,20 @@ class TokenScanner:
     def getNumberValue(self, token):
         return float(token)
 
+# Iterates over the remaining tokens, producing a tuple for each one
+# that contains the token, its type, and the position of its first
+# character.  The iteration stops at the end of the input.
+
+    def __iter__(self):
+        while True:
+            token = self.nextToken()
+            if token == "":
+                return
+            end = self._base + self._cp - len(self._savedCharacters)
+            if self._regexFlag:
+                end -= self._cp - self._rp
+            yield (token, self.getTokenType(token), end - len(token))
+
 # Returns a printable representation of this scanner.
 
     def __str__(self):
@@ -287,30 +312,77 @@ class TokenScanner:
 # Skips over any whitespace characters before the next token.
 
     def skipWhitespace(self):
+        self.syncCharacters()
         while True:
             ch = self.getChar()
             if ch == "" or not ch.isspace():
                 self.saveChar(ch)
                 break
+        self._rp = self._cp
 
 # Private methods 
 
+    def scanToken(self):
+        while True:
+            if self._ignoreWhitespaceFlag:
+                self.skipSpaces()
+            ch = self.getChar()
+            if ch == "":
+                return ""
+            if ch == "/" and self._ignoreCommentsFlag:
+                ch = self.getChar()
+                if ch == "/":
+                    ch = self.getChar()
+                    while ch != "\n" and ch != "\r" and ch != "":
+                        ch = self.getChar()
+                    continue
+                elif ch == "*":
+                    prev = ""
+                    while ch != "" and not(prev == "*" and ch == "/"):
+                        prev = ch
+                        ch = self.getChar()
+                    continue
+                self.saveChar(ch)
+                ch = "/"
+            if (ch == "'" or ch == "\"") and self._scanStringsFlag:
+                self.saveChar(ch)
+                return self.scanString()
+            if ch.isdigit() and self._scanNumbersFlag:
+                self.saveChar(ch)
+                return self.scanNumber()
+            if self.isWordCharacter(ch):
+                self.saveChar(ch)
+                return self.scanWord()
+            op = ch
+            while self.isOperatorPrefix(op):
+                ch = self.getChar()
+                if ch == "": break
+                op += ch
+            while len(op) > 1 and not self.isOperator(op):
+                self.saveChar(op[-1])
+                op = op[0:-1]
+            return op
+
     def getChar(self):
         if len(self._savedCharacters) == 0:
             if self._cp >= len(self._buffer):
                 if self._file is None:
                     return ""
-                self._buffer = self._file.readline()
+                self._base += len(self._buffer)
+                self._buffer = self._file.read(self._chunkSize)
+                self._cp = 0
+                self._rp = 0
                 if self._buffer == "":
+                    self._file = None
                     return ""
-                self._cp = 0
             self._cp += 1
             return self._buffer[self._cp - 1]
         else:
             return self._savedCharacters.pop()
 
     def saveChar(self, ch):
-        self._savedCharacters.append(ch)
+        if ch != "":
+            self._savedCharacters.append(ch)
 
     def skipSpaces(self):
         while True:
@@ -337,7 +409,6 @@ class TokenScanner:
         state = self._INITIAL_STATE
         while state != self._FINAL_STATE:
             ch = self.getChar()
-            xch = "e"
             if state == self._INITIAL_STATE:
                 if ch == "0":
                     state = self._LEADING_ZERO
@@ -348,14 +419,12 @@ class TokenScanner:
                     state = self._AFTER_DECIMAL_POINT
                 elif ch == "E" or ch == "e":
                     state = self._STARTING_EXPONENT
-                    xch = ch
                 elif not ch.isdigit():
                     self.saveChar(ch)
                     state = self._FINAL_STATE
             elif state == self._AFTER_DECIMAL_POINT:
                 if ch == "E" or ch == "e":
                     state = self._STARTING_EXPONENT
-                    xch = ch
                 elif not ch.isdigit():
                     self.saveChar(ch)
                     state = self._FINAL_STATE
@@ -372,7 +441,9 @@ class TokenScanner:
                     state = self._SCANNING_EXPONENT
                 else:
                     self.saveChar(ch)
-                    self.saveChar(xch)
+                    self.saveChar(token[-1])
+                    self.saveChar(token[-2])
+                    token = token[:-2]
                     state = self._FINAL_STATE
             elif state == self._SCANNING_EXPONENT:
                 if not ch.isdigit():
@@ -385,12 +456,11 @@ class TokenScanner:
                     state = self._AFTER_DECIMAL_POINT
                 elif ch == "E" or ch == "e":
                     state = self._STARTING_EXPONENT
-                    xch = ch
                 elif not ch.isdigit():
                     self.saveChar(ch)
                     state = self._FINAL_STATE
             elif state == self._SCANNING_HEX:
-                if not isxdigit(ch):
+                if not self.isHexDigit(ch):
                     self.saveChar(ch)
                     state = self._FINAL_STATE
             else:
@@ -409,7 +479,7 @@ class TokenScanner:
                 raise ScannerError("Unterminated string")
             if ch == delim: break
             if ch == "\\":
-                token += scanEscapeCharacter()
+                token += self.scanEscapeCharacter()
             else:
                 token += ch
         return token + delim
@@ -439,6 +509,161 @@ class TokenScanner:
                 return True
         return False
 
+# Implementation notes: Regular-expression scanning
+# -------------------------------------------------
+# When useRegularExpressions has been called, nextToken first tries
+# matchToken, which reads the next token from the string buffer using
+# a single regular expression compiled from the scanner configuration.
+# The expression skips any whitespace and comments that nextToken
+# would skip and then tries the same alternatives that nextToken tries,
+# in the same order: strings, numbers, words, operators, and finally
+# any single character.  The number pattern follows the states of the
+# scanNumber method, including its treatment of hexadecimal constants
+# and of an exponent marker that is not followed by digits.
+#
+# The character-by-character scanner often reads one or more characters
+# past the end of a token and pushes them back with saveChar, and the
+# value returned by getPosition counts those characters.  To report the
+# same positions, matchToken keeps the position of the next unread
+# character in self._rp and computes how far the character-by-character
+# scanner would have read, which becomes self._cp.  The characters in
+# between are handed to saveChar by syncCharacters whenever control
+# passes back to the character-by-character scanner.  That happens
+# for text that contains an unterminated string and for the rare
+# numbers that involve non-ASCII digits or an exponent sign not
+# followed by a digit, which matchToken signals by returning None.
+#
+# Input from a file is read in chunks of self._chunkSize characters,
+# and self._base records the position of the first character in the
+# buffer so that getPosition can report positions from the start of
+# the file.  A token may straddle the end of a chunk, so matchToken
+# asks for more input whenever a match runs to the end of the buffer,
+# or could be the beginning of a longer operator, and then matches
+# again.  Before the next chunk is appended, fillBuffer discards the
+# characters that have already been read, which keeps the size of the
+# buffer bounded by the chunk size plus the length of the longest token.
+
+    def matchToken(self):
+        if self._pattern is None:
+            self.compilePattern()
+        match = self._pattern.match(self._buffer, self._rp)
+        while self._file is not None and self.needsMoreInput(match):
+            if not self.fillBuffer():
+                break
+            match = self._pattern.match(self._buffer, self._rp)
+        buffer = self._buffer
+        n = len(buffer)
+        kind = match.lastgroup
+        end = match.end()
+        if kind == "word":
+            token = match.group(kind)
+            if self._scanNumbersFlag and token[0].isdigit():
+                return None
+            lookahead = end + 1 if end < n else end
+        elif kind == "number":
+            token = match.group(kind)
+            if end < n:
+                ch = buffer[end]
+                if ch.isdigit() or (token[-1] in "eE" and ch in "+-"):
+                    return None
+            lookahead = end + 1 if end < n else end
+        elif kind == "string":
+            token = match.group(kind)
+            lookahead = end
+        elif kind == "op":
+            token = match.group(kind)
+            start = match.start(kind)
+            lookahead = start + 1
+            while (buffer[start:lookahead] in self._operatorPrefixes
+                   and lookahead < n):
+                lookahead += 1
+            if buffer[start] == "/" and self._ignoreCommentsFlag:
+                lookahead = max(lookahead, min(start + 2, n))
+        elif kind == "eof":
+            token = ""
+            lookahead = end
+        else:
+            return None
+        self._rp = end
+        if lookahead > self._cp:
+            self._cp = lookahead
+        return token
+
+    def needsMoreInput(self, match):
+        buffer = self._buffer
+        kind = match.lastgroup
+        if kind == "bad" or match.end() == len(buffer):
+            return True
+        if kind == "op":
+            start = match.start(kind)
+            prefix = buffer[start:start + self._maxOperatorLength + 1]
+            return prefix in self._operatorPrefixes
+        return False
+
+    def fillBuffer(self):
+        if self._file is None:
+            return False
+        chunk = self._file.read(self._chunkSize)
+        if chunk == "":
+            self._file = None
+            return False
+        self._base += self._rp
+        self._buffer = self._buffer[self._rp:] + chunk
+        self._cp -= self._rp
+        self._rp = 0
+        return True
+
+    def syncCharacters(self):
+        if self._rp < self._cp:
+            pending = self._buffer[self._rp:self._cp]
+            self._savedCharacters.extend(reversed(pending))
+        self._rp = self._cp
+
+    def compilePattern(self):
+        skip = [ ]
+        if self._ignoreWhitespaceFlag:
+            spaceOps = "".join(op for op in self._operators
+                                  if len(op) == 1 and op.isspace())
+            if spaceOps == "":
+                skip.append(r"\s")
+            else:
+                skip.append("(?![" + re.escape(spaceOps) + r"])\s")
+        if self._ignoreCommentsFlag:
+            skip.append(r"//[^\n\r]*[\n\r]?")
+            skip.append(r"/\*(?:/|[\s\S]*?\*/|[\s\S]*\Z)")
+        pattern = ""
+        if len(skip) > 0:
+            pattern = "(?:" + "|".join(skip) + ")*"
+        options = [ ]
+        if self._scanStringsFlag:
+            options.append(r"""(?P<string>"(?:[^"\\]|\\[\s\S])*"|""" +
+                           r"""'(?:[^'\\]|\\[\s\S])*')|(?P<bad>["'])""")
+        if self._scanNumbersFlag:
+            options.append(r"(?P<number>0[0-9]*[xX][0-9A-Fa-f]*|" +
+                           r"[0-9]+(?:\.[0-9]*)?(?:[eE](?:[+-]?[0-9]+)?)?)")
+        wordChars = r"[^\W_]"
+        if self._wordChars != "":
+            wordChars = r"(?:[^\W_]|[" + re.escape(self._wordChars) + "])"
+        options.append("(?P<word>" + wordChars + "+)")
+        ops = sorted(self._operators, key=len, reverse=True)
+        options.append("(?P<op>" + "".join(re.escape(op) + "|" for op in ops)
+                       + r"[\s\S])")
+        options.append(r"(?P<eof>\Z)")
+        self._pattern = re.compile(pattern + "(?:" + "|".join(options) + ")")
+        self._operatorPrefixes = set()
+        self._maxOperatorLength = max(map(len, self._operators), default=0)
+        for op in self._operators:
+            for i in range(1, len(op) + 1):
+                self._operatorPrefixes.add(op[:i])
+
+# Implementation notes: ScannerError
+# ----------------------------------
+# The ScannerError exception is raised by the TokenScanner methods that
+# detect malformed input, such as an unterminated string.
+
+class ScannerError(Exception):
+    """Indicates an error in the input to a TokenScanner."""
+
 # Startup code
 
 if __name__ == "__main__":
@@ -2,11 +2,30 @@
 
 """
 This module implements the Floyd-Warshall algorithm for solving the
-all-pairs shortest-path problem.
+all-pairs shortest-path problem, along with Johnson's algorithm, which
+is faster for sparse graphs, and a function that chooses between them.
 """
 
+from graph import CSRGraph
+from pqueue import PriorityQueue, LAZY
+from bellmanford import NegativeCycleError, computePotentials
+from array import array
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
 import math
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Constants
+
+JOHNSON_DENSITY_LIMIT = 0.5
+NUMPY_JOHNSON_DENSITY_LIMIT = 0.003
+NUMPY_BLOCK_SIZE = 32
+TILE_SIZE = 256
+
 # Implementation notes
 # --------------------
 # The Floyd-Warshall algorithm operates by computing successive
@@ -14,29 +33,371 @@ import math
 # shortest distance from node i to node j, considering only paths
 # that pass through a set of points that grows on each cycle.
 # On cycle k (where k runs from 0 to n - 1), the distance includes
-# paths that pass through nodes with indices up to k.
+# paths that pass through nodes with indices up to k.  The new values
+# on cycle k depend only on row k and column k, which cycle k cannot
+# change unless d[k][k] is negative, so the matrices can be updated in
+# place rather than copied on every cycle.  In the negative case,
+# which arises only for graphs with negative cycles, row k is copied
+# first.  If NumPy is available, each cycle is computed with array
+# operations; otherwise, the Python loops skip the rows in which
+# d[i][k] is infinite and the columns in which d[k][j] is infinite,
+# since no path through k can improve those entries.
 
 def computeFloydWarshallMatrices(g):
     """
     Returns a tuple of the distance and predecessor matrices
     computed by the Floyd-Warshall algorithm when applied to g.
     """
-    n = len(g)
     d = createInitialDistanceMatrix(g)
     p = createInitialPredecessorMatrix(g)
+    if np is None:
+        applyFloydWarshall(d, p)
+    else:
+        applyFloydWarshallNumPy(d, p)
+    return (d,p)
+
+def applyFloydWarshall(d, p):
+    """
+    Applies the Floyd-Warshall algorithm to the distance and
+    predecessor matrices d and p, updating them in place.
+    """
+    n = len(d)
     for k in range(n):
-        d2 = copyMatrix(d)
-        p2 = copyMatrix(p)
+        dk = d[k]
+        pk = p[k]
+        if dk[k] < 0:
+            dk = list(dk)
+            pk = list(pk)
+        columns = [ j for j in range(n) if dk[j] < math.inf ]
         for i in range(n):
-            for j in range(n):
-                newDistance = d[i][k] + d[k][j]
-                if newDistance < d[i][j]:
-                    d2[i][j] = newDistance
-                    p2[i][j] = p[k][j]
-        d = d2
-        p = p2
+            di = d[i]
+            dik = di[k]
+            if dik < math.inf:
+                pi = p[i]
+                for j in columns:
+                    newDistance = dik + dk[j]
+                    if newDistance < di[j]:
+                        di[j] = newDistance
+                        pi[j] = pk[j]
+
+# Implementation notes: applyFloydWarshallNumPy
+# ---------------------------------------------
+# The NumPy version copies the matrices into arrays, with -1 standing
+# for None in the predecessor array.  On cycle k, adding column k to
+# row k with broadcasting gives the length of the path from every i to
+# every j through k.  The predecessors are updated wherever that length
+# is strictly smaller, which is the same test the Python loops use, so
+# both versions produce identical matrices.  Row k is copied before
+# the update in case a negative d[k][k] causes the row to change.
+# Each cycle processes NUMPY_BLOCK_SIZE rows at a time using the same
+# buffers, which keeps the work in the processor cache and avoids
+# allocating new arrays, and skips the updates for blocks in which
+# nothing improves.  The final arrays are copied back into d and p.
+
+def applyFloydWarshallNumPy(d, p):
+    """
+    Applies the Floyd-Warshall algorithm to the distance and
+    predecessor matrices d and p using NumPy, updating them in place.
+    """
+    n = len(d)
+    if n == 0:
+        return
+    D = np.array(d, dtype=float)
+    P = np.array([ [ -1 if pred is None else pred for pred in row ]
+                   for row in p ], dtype=np.int64)
+    through = np.empty((NUMPY_BLOCK_SIZE, n))
+    improved = np.empty((NUMPY_BLOCK_SIZE, n), dtype=bool)
+    for k in range(n):
+        dk = D[k].copy()
+        pk = P[k].copy()
+        for first in range(0, n, NUMPY_BLOCK_SIZE):
+            last = min(first + NUMPY_BLOCK_SIZE, n)
+            block = D[first:last]
+            blockThrough = through[:last - first]
+            blockImproved = improved[:last - first]
+            np.add(block[:, k, None], dk, out=blockThrough)
+            np.less(blockThrough, block, out=blockImproved)
+            if blockImproved.any():
+                np.copyto(block, blockThrough, where=blockImproved)
+                np.copyto(P[first:last], pk, where=blockImproved)
+    for i in range(n):
+        d[i][:] = D[i].tolist()
+        p[i][:] = [ None if pred < 0 else pred for pred in P[i].tolist() ]
+
+# Implementation notes: computeBlockedFloydWarshallMatrices
+# ---------------------------------------------------------
+# The blocked form of the Floyd-Warshall algorithm divides the matrices
+# into square tiles of TILE_SIZE rows and columns so that the data for
+# each step fits in the processor cache.  Round K applies the values of
+# k in tile K to the whole matrix in three phases.  The first phase
+# updates the diagonal tile (K, K), which depends only on itself.  The
+# second phase updates the other tiles in row K and column K, each of
+# which depends only on itself and the diagonal tile.  The third phase
+# updates every remaining tile (I, J), which depends only on the tiles
+# (I, K) and (K, J) from the second phase.  The tiles within a phase
+# are independent, so a pool of worker processes can update them in
+# parallel.  The matrices are stored in blocks of shared memory, which
+# the workers attach to when they start, so the only data passed for
+# each tile is a tuple of index ranges.  Each worker uses the NumPy
+# kernel if NumPy is available and the Python loops otherwise, in
+# which case the matrices are flat memoryviews indexed by i * n + j.
+# The final distances are the same as those computed by the unblocked
+# algorithm, but the predecessors are not, because a tile in the third
+# phase sees values of d[i][k] that already include later nodes in
+# tile K.  Each predecessor is still the start of an arc that lies on
+# some shortest path, but when the graph has a cycle of cost 0, the
+# predecessors in a row can lead around that cycle and never reach the
+# start node.  After the last round, applyBlockedFloydWarshall looks
+# for such loops and rebuilds each row that has one, as described in
+# the notes for repairPredecessorLoops.
+
+def computeBlockedFloydWarshallMatrices(g, tileSize=TILE_SIZE, processes=1):
+    """
+    Returns a tuple of the distance and predecessor matrices for g
+    computed by the blocked Floyd-Warshall algorithm using the
+    specified number of processes.
+    """
+    d = createInitialDistanceMatrix(g)
+    p = createInitialPredecessorMatrix(g)
+    applyBlockedFloydWarshall(d, p, tileSize, processes)
     return (d,p)
 
+def applyBlockedFloydWarshall(d, p, tileSize=TILE_SIZE, processes=1):
+    """
+    Applies the blocked Floyd-Warshall algorithm to the distance and
+    predecessor matrices d and p, updating them in place.  If processes
+    is greater than 1, the tiles in each phase are divided among that
+    many worker processes.
+    """
+    n = len(d)
+    if n == 0:
+        return
+    dShared = SharedMemory(create=True, size=8 * n * n)
+    pShared = SharedMemory(create=True, size=8 * n * n)
+    pool = None
+    try:
+        writeSharedMatrices(dShared, pShared, d, p)
+        arcs = getMatrixArcs(d, p)
+        if processes > 1:
+            pool = Pool(processes, attachSharedMatrices,
+                        (dShared.name, pShared.name, n))
+            runTiles = pool.map
+        else:
+            attachSharedMatrices(dShared.name, pShared.name, n)
+            runTiles = lambda fn, tiles: [ fn(tile) for tile in tiles ]
+        starts = range(0, n, tileSize)
+        for kFirst in starts:
+            kTile = (kFirst, min(kFirst + tileSize, n))
+            others = [ (first, min(first + tileSize, n))
+                       for first in starts if first != kFirst ]
+            runTiles(updateSharedTile, [ (kTile, kTile, kTile) ])
+            runTiles(updateSharedTile,
+                     [ (kTile, kTile, tile) for tile in others ] +
+                     [ (kTile, tile, kTile) for tile in others ])
+            runTiles(updateSharedTile,
+                     [ (kTile, rows, cols) for rows in others
+                                           for cols in others ])
+        detachSharedMatrices()
+        readSharedMatrices(dShared, pShared, d, p)
+        repairPredecessorLoops(d, p, arcs)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        dShared.close()
+        dShared.unlink()
+        pShared.close()
+        pShared.unlink()
+
+# Implementation notes: repairPredecessorLoops
+# --------------------------------------------
+# Every predecessor left by the blocked algorithm is tight, which means
+# that d[i][u] + cost == d[i][j] for the arc from u = p[i][j] to j, so
+# a loop among the predecessors can only follow arcs whose costs add
+# up to 0.  The repairPredecessorLoops function checks each row in
+# O(N) time by following the predecessors from every node and marking
+# the nodes already known to lead back to the start.  A row with a
+# loop is rebuilt by a breadth-first search from the start node along
+# tight arcs, which reaches every node on some shortest path and
+# assigns each node its predecessor only once, so the result is a
+# tree.  The arcs come from the initial matrices, which are saved by
+# getMatrixArcs before the algorithm overwrites them.  The comparison
+# allows for rounding when the costs are not integers.  If the graph
+# has a negative cycle, shortest paths are not defined and the rows
+# are left unchanged.
+
+def getMatrixArcs(d, p):
+    """
+    Returns a list whose element u is a list of (j, cost) pairs for
+    the arcs leaving u in the initial matrices d and p.
+    """
+    n = len(d)
+    return [ [ (j, d[u][j]) for j in range(n) if p[u][j] is not None ]
+             for u in range(n) ]
+
+def repairPredecessorLoops(d, p, arcs):
+    """
+    Rebuilds each row of the predecessor matrix p in which the
+    predecessors lead around a loop instead of back to the start.
+    """
+    n = len(d)
+    if any(d[k][k] < 0 for k in range(n)):
+        return
+    for i in range(n):
+        if hasPredecessorLoop(p[i], i):
+            rebuildPredecessorRow(d[i], p[i], i, arcs)
+
+def hasPredecessorLoop(row, start):
+    """
+    Returns True if following the predecessors in row from some node
+    leads around a loop that does not include start.
+    """
+    n = len(row)
+    state = [ None ] * n
+    state[start] = True
+    for j in range(n):
+        walk = [ ]
+        k = j
+        while k is not None and state[k] is None:
+            state[k] = False
+            walk.append(k)
+            k = row[k]
+        if k is not None and state[k] is False:
+            return True
+        for k in walk:
+            state[k] = True
+    return False
+
+def rebuildPredecessorRow(dRow, pRow, start, arcs):
+    """
+    Replaces the predecessors in pRow with a tree of shortest paths
+    from start built from the distances in dRow.
+    """
+    reached = { start }
+    queue = [ start ]
+    for u in queue:
+        du = dRow[u]
+        for j, cost in arcs[u]:
+            if j not in reached:
+                dj = dRow[j]
+                if du + cost <= dj + 1e-9 * max(1, abs(dj)):
+                    pRow[j] = u
+                    reached.add(j)
+                    queue.append(j)
+
+def updateTile(D, P, n, tile):
+    """
+    Applies the cycles for the values of k in one tile of nodes to the
+    tile of the matrices D and P with the specified rows and columns.
+    The tile argument is a tuple of three (first, last) index ranges.
+    """
+    (kFirst, kLast), (rowFirst, rowLast), (colFirst, colLast) = tile
+    if np is None:
+        for k in range(kFirst, kLast):
+            kRow = k * n
+            for i in range(rowFirst, rowLast):
+                iRow = i * n
+                dik = D[iRow + k]
+                if dik < math.inf:
+                    for j in range(colFirst, colLast):
+                        newDistance = dik + D[kRow + j]
+                        if newDistance < D[iRow + j]:
+                            D[iRow + j] = newDistance
+                            P[iRow + j] = P[kRow + j]
+    else:
+        block = D[rowFirst:rowLast, colFirst:colLast]
+        pBlock = P[rowFirst:rowLast, colFirst:colLast]
+        through = np.empty(block.shape)
+        improved = np.empty(block.shape, dtype=bool)
+        for k in range(kFirst, kLast):
+            np.add(D[rowFirst:rowLast, k, None], D[k, colFirst:colLast],
+                   out=through)
+            np.less(through, block, out=improved)
+            if improved.any():
+                pk = P[k, colFirst:colLast].copy()
+                np.copyto(block, through, where=improved)
+                np.copyto(pBlock, pk, where=improved)
+
+# Implementation notes: shared matrices
+# -------------------------------------
+# Each process that updates tiles keeps the SharedMemory objects and
+# the views of their contents in the sharedMatrices variable, which
+# attachSharedMatrices sets when a worker process starts.  The views
+# must be released before the main process closes the shared memory.
+
+sharedMatrices = None
+
+def attachSharedMatrices(dName, pName, n):
+    """Attaches this process to the shared matrices."""
+    global sharedMatrices
+    dShared = SharedMemory(dName)
+    pShared = SharedMemory(pName)
+    D, P = createSharedViews(dShared, pShared, n)
+    sharedMatrices = (dShared, pShared, D, P, n)
+
+def detachSharedMatrices():
+    """Releases the views of the shared matrices held by this process."""
+    global sharedMatrices
+    sharedMatrices = None
+
+def updateSharedTile(tile):
+    """Applies updateTile to the shared matrices."""
+    dShared, pShared, D, P, n = sharedMatrices
+    updateTile(D, P, n, tile)
+
+def createSharedViews(dShared, pShared, n):
+    """
+    Returns views of the shared distance and predecessor matrices,
+    which are n x n arrays if NumPy is available and flat memoryviews
+    otherwise.
+    """
+    if np is None:
+        D = dShared.buf[:8 * n * n].cast("d")
+        P = pShared.buf[:8 * n * n].cast("q")
+    else:
+        D = np.ndarray((n, n), dtype=float, buffer=dShared.buf)
+        P = np.ndarray((n, n), dtype=np.int64, buffer=pShared.buf)
+    return D, P
+
+def writeSharedMatrices(dShared, pShared, d, p):
+    """Copies the matrices d and p into the shared matrices."""
+    n = len(d)
+    D, P = createSharedViews(dShared, pShared, n)
+    for i in range(n):
+        pRow = [ -1 if pred is None else pred for pred in p[i] ]
+        if np is None:
+            D[i * n:(i + 1) * n] = array("d", d[i])
+            P[i * n:(i + 1) * n] = array("q", pRow)
+        else:
+            D[i] = d[i]
+            P[i] = pRow
+
+def readSharedMatrices(dShared, pShared, d, p):
+    """Copies the shared matrices back into the matrices d and p."""
+    n = len(d)
+    D, P = createSharedViews(dShared, pShared, n)
+    for i in range(n):
+        if np is None:
+            dRow = D[i * n:(i + 1) * n].tolist()
+            pRow = P[i * n:(i + 1) * n].tolist()
+        else:
+            dRow = D[i].tolist()
+            pRow = P[i].tolist()
+        d[i][:] = dRow
+        p[i][:] = [ None if pred < 0 else pred for pred in pRow ]
+
+# Implementation notes: initial matrices
+# --------------------------------------
+# The initial matrices are built in a single pass over the arcs, using
+# a dictionary that maps each node to its position in the sorted node
+# list.  Each arc lowers the entry for its endpoints to its cost if it
+# is cheaper than any arc seen so far, which gives the minimum cost
+# when there are parallel arcs.  Building the matrices takes O(N^2 + E)
+# time, most of which is spent filling the rows with their defaults.
+# Because the node indices in a CSRGraph are the positions of the nodes
+# in the sorted node list, the initial matrices for a CSRGraph can be
+# filled in directly from its arc arrays in the same way.
+
 def createInitialDistanceMatrix(g):
     """
     Returns the initial distance matrix d, which is constructed
@@ -44,15 +405,19 @@ def createInitialDistanceMatrix(g):
     if i == j, the length of the shortest arc in g that connects
     nodes i and j, and infinity if no connecting arc exists.
     """
-    nodes = g.getNodes();
-    n = len(nodes)
+    if isinstance(g, CSRGraph):
+        return createInitialDistanceMatrixCSR(g)
+    index = createNodeIndex(g)
+    n = len(index)
     d = [ [ math.inf ] * n for i in range(n) ]
+    for arc in g.getArcs():
+        row = d[index[arc.getStart()]]
+        j = index[arc.getFinish()]
+        cost = arc.getCost()
+        if cost < row[j]:
+            row[j] = cost
     for i in range(n):
-        for j in range(n):
-            if i == j:
-                d[i][j] = 0
-            else:
-                d[i][j] = minimumArcCost(nodes[i], nodes[j])
+        d[i][i] = 0
     return d
 
 def createInitialPredecessorMatrix(g):
@@ -62,24 +427,344 @@ def createInitialPredecessorMatrix(g):
     if there is an arc from i to j, and None if no connecting arc
     exists.
     """
-    nodes = g.getNodes();
-    n = len(nodes)
+    if isinstance(g, CSRGraph):
+        return createInitialPredecessorMatrixCSR(g)
+    index = createNodeIndex(g)
+    n = len(index)
+    p = [ [ None ] * n for i in range(n) ]
+    for arc in g.getArcs():
+        i = index[arc.getStart()]
+        p[i][index[arc.getFinish()]] = i
+    for i in range(n):
+        p[i][i] = None
+    return p
+
+def createNodeIndex(g):
+    """
+    Returns a dictionary that maps each node in g to its index in
+    the sorted list of nodes, which is the index used in the matrices.
+    """
+    return { node: i for i, node in enumerate(g.getNodes()) }
+
+def createInitialDistanceMatrixCSR(g):
+    """Returns the initial distance matrix for the CSRGraph g."""
+    n = len(g)
+    offsets = g.getOffsets()
+    targets = g.getTargets()
+    costs = g.getCosts()
+    d = [ [ math.inf ] * n for i in range(n) ]
+    for i in range(n):
+        row = d[i]
+        for k in range(offsets[i], offsets[i + 1]):
+            j = targets[k]
+            if costs[k] < row[j]:
+                row[j] = costs[k]
+        row[i] = 0
+    return d
+
+def createInitialPredecessorMatrixCSR(g):
+    """Returns the initial predecessor matrix for the CSRGraph g."""
+    n = len(g)
+    offsets = g.getOffsets()
+    targets = g.getTargets()
     p = [ [ None ] * n for i in range(n) ]
     for i in range(n):
-        for j in range(n):
-            if i != j and nodes[i].isConnectedTo(nodes[j]):
-                p[i][j] = i
+        row = p[i]
+        for k in range(offsets[i], offsets[i + 1]):
+            row[targets[k]] = i
+        row[i] = None
     return p
 
-def copyMatrix(m):
-    """Returns a copy of matrix m, which must be square."""
-    n = len(m)
-    return [ [ m[i][j] for j in range(n) ] for i in range(n) ]
-
-def minimumArcCost(n1, n2):
-    """Returns the minimal cost of the arcs between n1 and n2."""
-    minCost = math.inf
-    for arc in n1.getArcs():
-        if arc.getFinish() == n2:
-            minCost = min(minCost, arc.getCost())
-    return minCost
+# Implementation notes: computeAllPairsMatrices
+# ---------------------------------------------
+# The Floyd-Warshall algorithm takes O(N^3) time no matter how many
+# arcs the graph has, while Johnson's algorithm takes O(N E log N)
+# time, so Johnson's algorithm is faster when the number of arcs is
+# small compared with N^2.  The computeAllPairsMatrices function uses
+# Johnson's algorithm whenever the number of arcs is less than
+# JOHNSON_DENSITY_LIMIT times N^2.  For a graph with 250 nodes, the
+# Python version of Floyd-Warshall takes between 0.9 and 1.2 seconds
+# for any density above 0.05, while Johnson's algorithm takes 0.7
+# seconds at density 0.2 and 3.2 seconds for a complete graph.  The
+# NumPy version of Floyd-Warshall is faster still, taking 0.1 seconds
+# for 250 nodes and 1.3 seconds for 800, so Johnson's algorithm wins
+# only for the sparsest graphs, and the limit is the much smaller
+# NUMPY_JOHNSON_DENSITY_LIMIT when NumPy is available.  Johnson's
+# algorithm cannot handle a graph with a negative cycle, so
+# computeAllPairsMatrices falls back on Floyd-Warshall in that case,
+# which produces its usual matrices, in which a negative value on the
+# diagonal marks a node that lies on a negative cycle.
+
+def computeAllPairsMatrices(g):
+    """
+    Returns a tuple of the distance and predecessor matrices for g,
+    choosing between Johnson's algorithm and Floyd-Warshall based on
+    the density of the graph.
+    """
+    if isinstance(g, CSRGraph):
+        nArcs = g.getArcCount()
+    else:
+        nArcs = len(g.getArcs())
+    n = len(g)
+    if np is None:
+        limit = JOHNSON_DENSITY_LIMIT
+    else:
+        limit = NUMPY_JOHNSON_DENSITY_LIMIT
+    if nArcs < limit * n * n:
+        try:
+            return computeJohnsonMatrices(g)
+        except NegativeCycleError:
+            pass
+    return computeFloydWarshallMatrices(g)
+
+# Implementation notes: computeJohnsonMatrices
+# --------------------------------------------
+# Johnson's algorithm first computes a potential h for each node by
+# running the Bellman-Ford algorithm, as described in bellmanford.py.
+# Replacing the cost of each arc from u to v with the reduced cost
+# cost + h[u] - h[v] makes every cost nonnegative without changing
+# which paths are shortest, because the potentials along any path
+# from s to t cancel out except for h[s] - h[t].  The algorithm then
+# runs Dijkstra's algorithm from each node using the reduced costs and
+# converts each distance back by subtracting h[s] and adding h[t].
+# The matrices have the same form as those returned by the function
+# computeFloydWarshallMatrices, although the predecessor matrices can
+# differ when there is more than one shortest path between two nodes.
+# Rounding can make a reduced cost very slightly negative when the
+# costs are not integers, so the reduced costs are clamped at 0.
+
+def computeJohnsonMatrices(g):
+    """
+    Returns a tuple of the distance and predecessor matrices for g
+    computed by Johnson's algorithm.  If g contains a negative cycle,
+    computeJohnsonMatrices raises a NegativeCycleError.
+    """
+    if not isinstance(g, CSRGraph):
+        g = g.freeze()
+    n = len(g)
+    offsets = g.getOffsets()
+    targets = g.getTargets()
+    costs = g.getCosts()
+    h = computePotentials(g)
+    reduced = [ 0 ] * len(targets)
+    for i in range(n):
+        for k in range(offsets[i], offsets[i + 1]):
+            reduced[k] = max(0, costs[k] + h[i] - h[targets[k]])
+    d = [ ]
+    p = [ ]
+    for source in range(n):
+        distances, predecessors = computeShortestPaths(offsets, targets,
+                                                       reduced, source)
+        dRow = [ math.inf ] * n
+        pRow = [ None ] * n
+        for j, distance in distances.items():
+            dRow[j] = distance - h[source] + h[j]
+            pRow[j] = predecessors[j]
+        d.append(dRow)
+        p.append(pRow)
+    return (d, p)
+
+def computeShortestPaths(offsets, targets, costs, source):
+    """
+    Runs Dijkstra's algorithm from source over the arcs described by
+    the offsets, targets, and costs arrays, whose costs must be
+    nonnegative, and returns a tuple of dictionaries that map each
+    node index reached to its distance and its predecessor.
+    """
+    distances = { source: 0 }
+    predecessors = { source: None }
+    finalized = set()
+    frontier = PriorityQueue(LAZY)
+    frontier.enqueue(source, 0)
+    while not frontier.isEmpty():
+        index = frontier.dequeue()
+        finalized.add(index)
+        distance = distances[index]
+        for k in range(offsets[index], offsets[index + 1]):
+            neighbor = targets[k]
+            if neighbor not in finalized:
+                newDistance = distance + costs[k]
+                if newDistance < distances.get(neighbor, math.inf):
+                    distances[neighbor] = newDistance
+                    predecessors[neighbor] = index
+                    if neighbor in frontier:
+                        frontier.raisePriority(neighbor, newDistance)
+                    else:
+                        frontier.enqueue(neighbor, newDistance)
+    return distances, predecessors
+
+# Implementation notes: applyArcDecrease
+# --------------------------------------
+# When an arc from u to v is added or its cost is lowered, the only
+# paths that become shorter are those that use the new arc, and a
+# shortest path uses it at most once unless it creates a negative
+# cycle.  The new distance from i to j is therefore the smaller of the
+# old d[i][j] and d[i][u] + cost + d[v][j], where d[i][u] and d[v][j]
+# are the old distances, which lets applyArcDecrease update every pair
+# in O(N^2) time instead of the O(N^3) needed to start over.  On the
+# new path, the predecessor of j is u if j is v and is otherwise the
+# predecessor of j on the path from v.  Column u and row v can change
+# only if the arc closes a negative cycle, in which case the updated
+# values would be wrong, so applyArcDecrease returns False without
+# changing the matrices if the arc closes a negative cycle or if the
+# matrices already show one.  There is no equally simple update when
+# an arc is removed or its cost goes up, because every shortest path
+# that used the arc must be found again, so those changes require the
+# matrices to be computed from scratch.
+
+def applyArcDecrease(d, p, u, v, cost):
+    """
+    Updates the distance and predecessor matrices d and p in place
+    for a new or cheaper arc from index u to index v with the given
+    cost.  The applyArcDecrease function returns True if the matrices
+    are correct for the new graph and False if it could not update
+    them because the graph has a negative cycle.
+    """
+    n = len(d)
+    if any(d[k][k] < 0 for k in range(n)) or d[v][u] + cost < 0:
+        return False
+    if cost >= d[u][v]:
+        return True
+    toU = [ d[i][u] for i in range(n) ]
+    fromV = list(d[v])
+    predecessors = list(p[v])
+    predecessors[v] = u
+    columns = [ j for j in range(n) if fromV[j] < math.inf ]
+    for i in range(n):
+        if toU[i] < math.inf:
+            di = d[i]
+            pi = p[i]
+            base = toU[i] + cost
+            for j in columns:
+                newDistance = base + fromV[j]
+                if newDistance < di[j]:
+                    di[j] = newDistance
+                    pi[j] = predecessors[j]
+    return True
+
+# Implementation notes: AllPairsIndex class
+# -----------------------------------------
+# The AllPairsIndex class answers distance and path queries for a
+# graph from a single computation of the all-pairs matrices.  It
+# records the version of the graph for which the matrices were
+# computed and recomputes them on the next query after the version
+# changes, which happens whenever a node or arc is added or removed.
+# Changing the cost of an existing arc does not change the version, so
+# clients that do so must call invalidate.  The index also keeps the
+# dictionary that maps each node to its row in the matrices, so that a
+# query takes constant time for a distance and time proportional to
+# the number of arcs in the path for a path.  The getPath method
+# follows the predecessors back from the finish node, because row i of
+# the predecessor matrix describes a tree of shortest paths from i.
+# If those predecessors lead around a cycle, that cycle has negative
+# cost, and getPath raises a NegativeCycleError.  Clients that add an
+# arc between existing nodes or lower the cost of an arc can call
+# updateArc, which applies applyArcDecrease to the cached matrices if
+# that is the only change since they were computed.  Any other change,
+# including an arc whose cost goes up, makes updateArc discard the
+# matrices, which are then recomputed by the next query.
+
+class AllPairsIndex:
+    """This class caches the all-pairs shortest paths for a graph."""
+
+    def __init__(self, g):
+        """Creates an AllPairsIndex for the graph g."""
+        self._graph = g
+        self.invalidate()
+
+    def getGraph(self):
+        """Returns the graph for which this index answers queries."""
+        return self._graph
+
+    def invalidate(self):
+        """Discards the matrices so that the next query recomputes them."""
+        self._version = None
+        self._nodes = None
+        self._index = None
+        self._d = None
+        self._p = None
+
+    def getNodes(self):
+        """Returns the sorted list of nodes that index the matrices."""
+        self._update()
+        return list(self._nodes)
+
+    def getDistanceMatrix(self):
+        """Returns the shortest-distance matrix for the graph."""
+        self._update()
+        return self._d
+
+    def getPredecessorMatrix(self):
+        """Returns the predecessor matrix for the graph."""
+        self._update()
+        return self._p
+
+    def getDistance(self, start, finish):
+        """
+        Returns the length of the shortest path from start to finish,
+        or infinity if there is no path.
+        """
+        self._update()
+        return self._d[self._index[start]][self._index[finish]]
+
+    def getPath(self, start, finish):
+        """
+        Returns a list of the nodes on the shortest path from start to
+        finish, or None if there is no path.
+        """
+        self._update()
+        i = self._index[start]
+        j = self._index[finish]
+        if i == j:
+            return [ start ]
+        row = self._p[i]
+        if row[j] is None:
+            return None
+        path = [ ]
+        positions = { }
+        while j != i:
+            if j in positions:
+                cycle = [ self._nodes[k] for k in path[positions[j]:] ]
+                cycle.reverse()
+                raise NegativeCycleError(cycle)
+            positions[j] = len(path)
+            path.append(j)
+            j = row[j]
+        path.append(i)
+        path.reverse()
+        return [ self._nodes[k] for k in path ]
+
+    def updateArc(self, arc, oldCost=None):
+        """
+        Updates the matrices after arc has been added to the graph or,
+        if oldCost is specified, after the cost of arc has changed from
+        oldCost to its current value.
+        """
+        if self._version is None:
+            return
+        expected = self._version
+        if oldCost is None:
+            expected += 1
+        if (self._graph.getVersion() != expected or
+                (oldCost is not None and arc.getCost() > oldCost) or
+                not applyArcDecrease(self._d, self._p,
+                                     self._index[arc.getStart()],
+                                     self._index[arc.getFinish()],
+                                     arc.getCost())):
+            self.invalidate()
+        else:
+            self._version = self._graph.getVersion()
+
+# Private methods
+
+    def _update(self):
+        """Recomputes the matrices if the graph has changed."""
+        if isinstance(self._graph, CSRGraph):
+            version = 0
+        else:
+            version = self._graph.getVersion()
+        if version != self._version:
+            self._nodes = self._graph.getNodes()
+            self._index = { node: i for i, node in enumerate(self._nodes) }
+            self._d, self._p = computeAllPairsMatrices(self._graph)
+            self._version = version
@@ -0,0 +1,152 @@
+# File: FloydWarshallBenchmark.py
+
+"""
+This program measures the running time of the Floyd-Warshall algorithm
+on a large random graph, first in its unblocked form and then in its
+blocked form using an increasing number of processes, and reports the
+speedup of each blocked run relative to the blocked run that uses a
+single process.  It also checks that every run computes the same
+distances and that the predecessors in every row lead back to the
+start node, first on a small graph with a cycle of cost 0, on which
+an earlier version of the blocked algorithm produced a predecessor
+loop, and then on the benchmark graph.  The number of nodes and the
+list of process counts can be given on the command line, as in
+
+    python FloydWarshallBenchmark.py 2000 1 2 4 8
+
+If no process counts are given, the program uses the powers of two up
+to the number of processors on the machine.
+"""
+
+import gc
+import os
+import random
+import sys
+import time
+
+from graph import Graph
+from FloydWarshall import createInitialDistanceMatrix
+from FloydWarshall import createInitialPredecessorMatrix
+from FloydWarshall import applyFloydWarshall, applyFloydWarshallNumPy
+from FloydWarshall import applyBlockedFloydWarshall
+from FloydWarshall import computeBlockedFloydWarshallMatrices
+import FloydWarshall
+
+ARCS_PER_NODE = 4
+
+# The zero-cost cycle graph is a list of (start, finish, cost) arcs.
+
+ZERO_CYCLE_ARCS = [ (0, 2, 0), (2, 0, 0), (1, 3, 1), (3, 0, 2) ]
+
+def createRandomGraph(nNodes, nArcs, seed=0):
+    """
+    Returns a graph with nNodes nodes and nArcs randomly chosen arcs
+    whose costs are integers between 1 and 100.
+    """
+    rand = random.Random(seed)
+    g = Graph()
+    nodes = [ g.addNode("N" + str(i).zfill(6)) for i in range(nNodes) ]
+    for i in range(nArcs):
+        arc = g.addArc(rand.choice(nodes), rand.choice(nodes))
+        arc.setCost(rand.randint(1, 100))
+    return g
+
+def timeFunction(fn):
+    """
+    Calls fn and returns the elapsed time in seconds, with garbage
+    collection turned off while fn runs.
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+def getDefaultProcessCounts():
+    """Returns the powers of two up to the number of processors."""
+    nCores = os.cpu_count() or 1
+    counts = [ ]
+    count = 1
+    while count < nCores:
+        counts.append(count)
+        count *= 2
+    counts.append(nCores)
+    return counts
+
+def findPredecessorError(d, p, d0):
+    """
+    Returns a (start, finish) pair for which following the predecessors
+    in p does not lead back to start along arcs whose costs in the
+    initial distance matrix d0 add up to d[start][finish], or None if
+    there is no such pair.
+    """
+    n = len(d)
+    for i in range(n):
+        valid = { i }
+        for j in range(n):
+            walk = [ ]
+            k = j
+            while d[i][k] < float("inf") and k not in valid:
+                u = p[i][k]
+                if u is None or u in walk or d[i][u] + d0[u][k] != d[i][k]:
+                    return (i, j)
+                walk.append(k)
+                k = u
+            valid.update(walk)
+    return None
+
+def checkZeroCostCycle():
+    """Checks the blocked algorithm on a graph with a cycle of cost 0."""
+    g = Graph()
+    nodes = [ g.addNode("N" + str(i)) for i in range(4) ]
+    for start, finish, cost in ZERO_CYCLE_ARCS:
+        g.addArc(nodes[start], nodes[finish]).setCost(cost)
+    d, p = computeBlockedFloydWarshallMatrices(g, tileSize=2)
+    if findPredecessorError(d, p, createInitialDistanceMatrix(g)) is None:
+        print("Zero-cost cycle check succeeded")
+    else:
+        print("Zero-cost cycle check failed")
+
+def FloydWarshallBenchmark(nNodes=2000, *processCounts):
+    checkZeroCostCycle()
+    if len(processCounts) == 0:
+        processCounts = getDefaultProcessCounts()
+    g = createRandomGraph(nNodes, ARCS_PER_NODE * nNodes)
+    print("Graph with " + str(nNodes) + " nodes and " +
+          str(len(g.getArcs())) + " arcs on " +
+          str(os.cpu_count()) + " processors")
+    if FloydWarshall.np is None:
+        print("NumPy is not available; using the Python loops")
+    d0 = createInitialDistanceMatrix(g)
+    p0 = createInitialPredecessorMatrix(g)
+    d = [ list(row) for row in d0 ]
+    p = [ list(row) for row in p0 ]
+    if FloydWarshall.np is None:
+        elapsed = timeFunction(lambda: applyFloydWarshall(d, p))
+    else:
+        elapsed = timeFunction(lambda: applyFloydWarshallNumPy(d, p))
+    print("  unblocked             %7.2f sec" % elapsed)
+    expected = d
+    baseline = None
+    for processes in processCounts:
+        d = [ list(row) for row in d0 ]
+        p = [ list(row) for row in p0 ]
+        elapsed = timeFunction(lambda: applyBlockedFloydWarshall(d, p,
+                                                  processes=processes))
+        if baseline is None:
+            baseline = elapsed
+        print("  blocked, " + str(processes).rjust(3) + " processes" +
+              "%7.2f sec   speedup %5.2f" % (elapsed, baseline / elapsed))
+        if d != expected:
+            print("Distances differ for " + str(processes) + " processes")
+        if findPredecessorError(d, p, d0) is not None:
+            print("Predecessors are invalid for " + str(processes) +
+                  " processes")
+
+# Startup code
+
+if __name__ == "__main__":
+    FloydWarshallBenchmark(*[ int(arg) for arg in sys.argv[1:] ])
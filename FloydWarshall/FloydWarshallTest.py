@@ -6,7 +6,7 @@ Floyd-Warshall algorithm.
 """
 
 from graphtest import GraphConsoleTest
-from FloydWarshall import computeFloydWarshallMatrices
+from FloydWarshall import AllPairsIndex
 
 # Constants
 
@@ -17,51 +17,57 @@ COLUMN_WIDTH = 5
 class FloydWarshallTest(GraphConsoleTest):
 
     def __init__(self):
+        self.allPairs = None
         GraphConsoleTest.__init__(self)
 
+    def arcCommand(self, scanner):
+        """arc n1 n2 [cost] -- Adds an arc from n1 to n2"""
+        arc = GraphConsoleTest.arcCommand(self, scanner)
+        allPairs = self.allPairs
+        if allPairs is not None and allPairs.getGraph() is self.graph:
+            allPairs.updateArc(arc)
+
     def distancesCommand(self, scanner):
         """distances -- Prints the shortest-distance matrix for the graph"""
-        d,p = computeFloydWarshallMatrices(self.graph)
-        printDistanceMatrix(self.graph.getNodes(), d)
+        index = self.getAllPairsIndex()
+        printDistanceMatrix(index.getNodes(), index.getDistanceMatrix())
 
     def predecessorsCommand(self, scanner):
         """predecessors -- Prints the predecessor matrix for the graph"""
-        d,p = computeFloydWarshallMatrices(self.graph)
-        printPredecessorMatrix(self.graph.getNodes(), p)
+        index = self.getAllPairsIndex()
+        printPredecessorMatrix(index.getNodes(), index.getPredecessorMatrix())
 
     def pathCommand(self, scanner):
         """path start finish -- Compute shortest path from start to finish """
-        #Takes names of two nodes, displays the minimum path btwn those nodes
-        #The difference is that the data for computing the shortest path
-        #comes from the predecessor matrix returned by computeFloydWarshallMatrices function
-
         start = self.scanNode(scanner)
         finish = self.scanNode(scanner)
-        #Get distance and predecessor matrices d and p 
-        d,p = computeFloydWarshallMatrices(self.graph)
-        #ELEM p[i][j] is 1 if there is an arc fom i to j
         if start == finish:
             print(str(start.getName() + "(0)"))
             return
-
-        #WE NEED INDICES
-        holddict  = {}
-        holdnodes = self.graph.getNodes()
-        for n in range(len(holdnodes)):
-            holddict[holdnodes[n]] = n
-
-        nextnode = p[holddict[finish]][holddict[start]] 
-        holdpath = []
-        holdvalue = d[holddict[finish]][holddict[start]]
-        while nextnode != None:
-            holdpath.append(holdnodes[nextnode])
-            nextnode = p[holddict[finish]][nextnode]
-        holdpathstr = start.getName()
-        for n in holdpath:
-            holdpathstr += (" -> "+ n.getName())
-
-        print("The minimum arc between start and finish is: " + holdpathstr)
-        print("The minimum arc cost between start and finish is: (" + str(holdvalue) + ")")
+        index = self.getAllPairsIndex()
+        path = index.getPath(start, finish)
+        if path is None:
+            print("No path from " + start.getName() +
+                  " to " + finish.getName())
+            return
+        pathstr = " -> ".join(node.getName() for node in path)
+        print("The minimum arc between start and finish is: " + pathstr)
+        print("The minimum arc cost between start and finish is: (" +
+              str(index.getDistance(start, finish)) + ")")
+
+# Implementation notes: getAllPairsIndex
+# --------------------------------------
+# The test program keeps a single AllPairsIndex so that the distances,
+# predecessors, and path commands share the matrices, which the index
+# recomputes only after the graph changes.  The arc command updates the
+# matrices in place when it adds an arc between two existing nodes.
+
+    def getAllPairsIndex(self):
+        """Returns the AllPairsIndex for the current graph."""
+        allPairs = self.allPairs
+        if allPairs is None or allPairs.getGraph() is not self.graph:
+            self.allPairs = AllPairsIndex(self.graph)
+        return self.allPairs
 
 def printDistanceMatrix(nodes, d):
     n = len(nodes)
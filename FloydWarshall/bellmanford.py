@@ -0,0 +1,251 @@
+# File: bellmanford.py
+
+"""
+This module implements the Bellman-Ford algorithm for solving the
+single-source shortest-path problem on graphs whose arc costs may be
+negative, along with a queue-based variant that is usually much
+faster and a function that finds a cycle whose total cost is negative.
+"""
+
+from collections import deque
+from graph import CSRGraph
+import math
+
+# Implementation notes: NegativeCycleError
+# ----------------------------------------
+# If a cycle whose total cost is negative can be reached from the start
+# node, the nodes on that cycle and every node reachable from it have
+# no shortest path, because each trip around the cycle makes the path
+# shorter.  The functions in this module report that situation by
+# raising a NegativeCycleError, whose cycle attribute is the list of
+# nodes on one such cycle in the order in which the arcs connect them.
+# The class is a subclass of ValueError so that existing code that
+# catches ValueError for illegal graphs continues to work.
+
+class NegativeCycleError(ValueError):
+    """This exception is raised when a graph has a negative-cost cycle."""
+
+    def __init__(self, cycle):
+        """Creates a NegativeCycleError for the specified list of nodes."""
+        names = [ str(node) for node in cycle + cycle[:1] ]
+        ValueError.__init__(self, "Negative cycle: " + " -> ".join(names))
+        self.cycle = cycle
+
+# Implementation notes: bellmanFord
+# ---------------------------------
+# The bellmanFord function relaxes every arc in the graph in a series
+# of passes.  After pass k, the distance to every node whose shortest
+# path has at most k arcs is correct, so n - 1 passes are enough for a
+# graph with n nodes.  Most graphs need far fewer, so the function
+# stops as soon as a pass changes nothing.  If the distances are still
+# changing after n - 1 passes, and a further pass changes them again,
+# there must be a negative cycle.  Like shortestPath in dijkstra.py,
+# bellmanFord returns dictionaries of distances and predecessors for
+# the nodes that the search reaches, and the nodes of a CSRGraph are
+# represented by their integer indices.
+
+def bellmanFord(g, start):
+    """
+    Runs the Bellman-Ford algorithm from start and returns a tuple of
+    two dictionaries, the first mapping each node reached to its
+    distance from start and the second mapping it to its predecessor
+    on the shortest path.  If a negative cycle can be reached from
+    start, bellmanFord raises a NegativeCycleError.
+    """
+    if isinstance(g, CSRGraph):
+        start = g.indexOf(start)
+    arcs = getArcList(g)
+    distances = { start: 0 }
+    predecessors = { start: None }
+    for i in range(len(g) - 1):
+        if not relaxArcs(arcs, distances, predecessors):
+            return distances, predecessors
+    if relaxArcs(arcs, distances, predecessors):
+        raise NegativeCycleError(extractCycle(arcs, distances, predecessors))
+    return distances, predecessors
+
+# Implementation notes: spfa
+# --------------------------
+# The spfa function, whose name stands for "shortest path faster
+# algorithm," is the queue-based form of Bellman-Ford.  Instead of
+# relaxing every arc in each pass, it keeps a first-in/first-out queue
+# of the nodes whose distance has changed and relaxes only the arcs
+# leaving those nodes.  A node that is already waiting in the queue is
+# not added again.  On typical graphs, each node enters the queue only
+# a few times, which makes the running time close to linear in the
+# size of the graph, although the worst case is the same O(N * E) as
+# bellmanFord.  The queue processes the nodes in the same rounds as
+# the passes of bellmanFord, and no node can enter the queue more than
+# once in each round.  If there is no negative cycle, there are at
+# most n rounds, so a node that enters the queue more than n times
+# proves that a negative cycle exists.
+
+def spfa(g, start):
+    """
+    Runs the queue-based form of the Bellman-Ford algorithm from start
+    and returns the same results as bellmanFord.  If a negative cycle
+    can be reached from start, spfa raises a NegativeCycleError.
+    """
+    if isinstance(g, CSRGraph):
+        start = g.indexOf(start)
+    distances = { start: 0 }
+    predecessors = { start: None }
+    relaxFromQueue(g, distances, predecessors)
+    return distances, predecessors
+
+# Implementation notes: computePotentials
+# ---------------------------------------
+# Johnson's algorithm for the all-pairs problem needs a potential h
+# for each node such that cost + h[start] - h[finish] is never
+# negative for any arc, which lets it run Dijkstra's algorithm on a
+# graph with negative costs.  The distances from an extra node that
+# has an arc of cost 0 to every other node have that property.  The
+# computePotentials function computes those distances without adding
+# the extra node, by starting the queue-based search with every node
+# at distance 0, which is where the first round of relaxation would
+# put them.
+
+def computePotentials(g):
+    """
+    Returns a dictionary that maps each node in g to a potential h
+    such that cost + h[start] - h[finish] >= 0 for every arc.  If g
+    contains a negative cycle, computePotentials raises a
+    NegativeCycleError.  For a CSRGraph, the keys are node indices.
+    """
+    if isinstance(g, CSRGraph):
+        nodes = range(len(g))
+    else:
+        nodes = g.getNodes()
+    distances = { node: 0 for node in nodes }
+    predecessors = { node: None for node in nodes }
+    relaxFromQueue(g, distances, predecessors)
+    return distances
+
+def relaxFromQueue(g, distances, predecessors):
+    """
+    Runs the queue-based search starting with the nodes that appear in
+    distances, updating distances and predecessors as it goes.
+    """
+    if isinstance(g, CSRGraph):
+        neighbors = g.getArcsFrom
+    else:
+        neighbors = getSuccessors
+    n = len(g)
+    queue = deque(distances)
+    queued = set(distances)
+    counts = { node: 1 for node in distances }
+    while len(queue) > 0:
+        node = queue.popleft()
+        queued.remove(node)
+        distance = distances[node]
+        for neighbor, cost in neighbors(node):
+            newDistance = distance + cost
+            if newDistance < distances.get(neighbor, math.inf):
+                distances[neighbor] = newDistance
+                predecessors[neighbor] = node
+                if neighbor not in queued:
+                    count = counts.get(neighbor, 0) + 1
+                    if count > n:
+                        arcs = getArcList(g)
+                        raise NegativeCycleError(extractCycle(arcs, distances,
+                                                              predecessors))
+                    counts[neighbor] = count
+                    queue.append(neighbor)
+                    queued.add(neighbor)
+
+def findNegativeCycle(g, start=None):
+    """
+    Returns a list of the nodes on a cycle in g whose total cost is
+    negative, or None if there is no such cycle.  If start is
+    specified, only cycles that can be reached from start are
+    considered; otherwise, the cycle may be anywhere in the graph.
+    """
+    try:
+        if start is None:
+            computePotentials(g)
+        else:
+            spfa(g, start)
+    except NegativeCycleError as ex:
+        return ex.cycle
+    return None
+
+def getSuccessors(node):
+    """Returns a list of (finish, cost) pairs for the arcs leaving node."""
+    return [ (arc.getFinish(), arc.getCost()) for arc in node.getArcsFrom() ]
+
+def getArcList(g):
+    """
+    Returns a list of (start, finish, cost) triples for the arcs in g.
+    For a CSRGraph, the nodes are represented by their indices.
+    """
+    if isinstance(g, CSRGraph):
+        offsets = g.getOffsets()
+        targets = g.getTargets()
+        costs = g.getCosts()
+        return [ (i, targets[k], costs[k])
+                 for i in range(len(g))
+                 for k in range(offsets[i], offsets[i + 1]) ]
+    return [ (arc.getStart(), arc.getFinish(), arc.getCost())
+             for arc in g.getArcs() ]
+
+def relaxArcs(arcs, distances, predecessors):
+    """
+    Relaxes every arc in the list of (start, finish, cost) triples,
+    updating the distances and predecessors dictionaries, and returns
+    True if any distance changed.
+    """
+    changed = False
+    for start, finish, cost in arcs:
+        distance = distances.get(start)
+        if distance is not None:
+            newDistance = distance + cost
+            if newDistance < distances.get(finish, math.inf):
+                distances[finish] = newDistance
+                predecessors[finish] = start
+                changed = True
+    return changed
+
+# Implementation notes: extractCycle
+# ----------------------------------
+# Each node reached by the search has a single predecessor, so
+# following the predecessors from any node either ends at the start
+# node or runs into a cycle.  Every cycle formed by the predecessors
+# has a negative total cost, and as long as a negative cycle can be
+# reached, the distances keep decreasing.  Distances that are
+# supported by a tree of predecessors cannot fall below the cost of
+# the simple paths in that tree, so further passes must eventually
+# produce a cycle among the predecessors.  The extractCycle function
+# therefore alternates between looking for such a cycle and relaxing
+# every arc again.  It must be called only when a negative cycle is
+# known to exist.
+
+def extractCycle(arcs, distances, predecessors):
+    """
+    Returns the list of nodes on a negative cycle in the order in
+    which the arcs connect them, relaxing the arcs further if the
+    predecessors do not yet contain a cycle.
+    """
+    while True:
+        cycle = findPredecessorCycle(predecessors)
+        if cycle is not None:
+            return cycle
+        relaxArcs(arcs, distances, predecessors)
+
+def findPredecessorCycle(predecessors):
+    """
+    Returns the list of nodes on a cycle formed by the predecessors
+    dictionary, or None if there is no such cycle.
+    """
+    visited = { }
+    for first in predecessors:
+        node = first
+        walk = [ ]
+        while node is not None and node not in visited:
+            visited[node] = first
+            walk.append(node)
+            node = predecessors[node]
+        if node is not None and visited[node] == first:
+            cycle = walk[walk.index(node):]
+            cycle.reverse()
+            return cycle
+    return None
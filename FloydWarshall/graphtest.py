@@ -8,15 +8,18 @@ to test specific implementations extend this framework with a new
 subclass that adds any new commands required for that implementation.
 """
 
+import os
+
 from consoletest import ConsoleTest
 from graph import Graph, Node, Arc
 from graphtools import readGraphData
+from graphtools import isGraphSnapshot, loadGraphSnapshot, saveGraphSnapshot
 from tokenscanner import TokenScanner
 
 class GraphConsoleTest(ConsoleTest):
 
     def __init__(self):
-        self.graph = Graph()
+        self.graph = self.createGraph()
         self.run()
 
 # Commands
@@ -26,16 +29,17 @@ class GraphConsoleTest(ConsoleTest):
         self.graph.clear()
 
     def loadCommand(self, scanner):
-        """load filename -- Loads the graph data from the file"""
-        filename = scanner.nextToken()
-        ttype = scanner.getTokenType(filename)
-        if ttype == TokenScanner.WORD:
-            filename += ".txt"
-        elif ttype == TokenScanner.STRING:
-            filename = scanner.getStringValue(filename)
+        """load filename -- Loads the graph data or snapshot from the file"""
+        filename = self.scanFilenameToken(scanner, ".graph", ".txt")
+        if isGraphSnapshot(filename):
+            loadGraphSnapshot(filename, self.graph)
         else:
-            print("Illegal file name")
-        readGraphData(self.graph, filename)
+            readGraphData(self.graph, filename)
+
+    def saveCommand(self, scanner):
+        """save filename -- Saves the graph as a binary snapshot"""
+        filename = self.scanFilenameToken(scanner, ".graph")
+        saveGraphSnapshot(self.graph, filename)
 
     def nodeCommand(self, scanner):
         """node name -- Inserts a node with the specified name"""
@@ -51,9 +55,10 @@ class GraphConsoleTest(ConsoleTest):
             n2 = self.graph.addNode(n2)
         cost = 0
         if scanner.hasMoreTokens():
-            cost = self.scanNumber()
+            cost = self.scanNumber(scanner)
         arc = self.graph.addArc(n1, n2)
         arc.setCost(cost)
+        return arc
 
     def arcsCommand(self, scanner):
         """arcs -- Lists the arcs in the graph"""
@@ -98,6 +103,12 @@ class GraphConsoleTest(ConsoleTest):
         for arc in self.scanNode(scanner).getArcs():
             print(arc.getFinish())
 
+# Methods available for clients to override
+
+    def createGraph(self):
+        """Creates the graph used in this test program."""
+        return Graph()
+
 # Methods used by subclasses
 
     def getGraph(self):
@@ -113,6 +124,26 @@ class GraphConsoleTest(ConsoleTest):
             token = scanner.nextToken()
         return sign * float(token)
 
+    def scanFilenameToken(self, scanner, *extensions):
+        """
+        Reads a filename from the scanner as a single token.  A
+        filename written as a word has the first of the extensions
+        for which a file exists added to it, or the last extension if
+        there is no such file.  A filename written as a quoted string
+        is used as is.
+        """
+        filename = scanner.nextToken()
+        ttype = scanner.getTokenType(filename)
+        if ttype == TokenScanner.WORD:
+            for extension in extensions:
+                if os.path.exists(filename + extension):
+                    break
+            return filename + extension
+        elif ttype == TokenScanner.STRING:
+            return scanner.getStringValue(filename)
+        else:
+            raise SyntaxError("Illegal file name")
+
     def scanNodeName(self, scanner):
         """Reads the name of a node from the scanner."""
         token = scanner.nextToken()
@@ -124,7 +155,7 @@ class GraphConsoleTest(ConsoleTest):
         elif ttype == TokenScanner.STRING:
             return scanner.getStringValue(token)
         else:
-            raise SyntaxError("Illegal node name: " + name)
+            raise SyntaxError("Illegal node name: " + token)
 
     def scanNode(self, scanner):
         """Reads the next token and makes sure it is a node name."""
@@ -0,0 +1,734 @@
+# File: pqueue.py
+
+"""
+This module implements the priority queue abstraction using a heap to
+represent a partially ordered tree in which every node is smaller
+than either of its children.  Maintaining this property during add
+and remove operations requires log N time.  The constructor takes an
+optional backend argument that selects a different representation,
+as described in the implementation notes for the backends.
+"""
+
+import heapq
+import math
+
+# Constants
+
+BINARY = "binary"
+LAZY = "lazy"
+DARY = "dary"
+PAIRING = "pairing"
+BUCKET = "bucket"
+
+class PriorityQueue:
+    """
+    This class implements a queue structure whose elements are
+    removed in priority order.  As in conventional English usage,
+    lower priority values are removed first.  Thus, priority 1
+    items come before priority 2.
+    """
+
+    def __new__(cls, backend=BINARY, **options):
+        """
+        Creates a queue of the class that implements backend.  Any
+        keyword options, such as the arity of a DARY queue, are passed
+        on to the constructor for that class.
+        """
+        if cls is PriorityQueue:
+            cls = _BACKENDS.get(backend)
+            if cls is None:
+                raise ValueError("Unknown priority queue backend: " +
+                                 str(backend))
+        return object.__new__(cls)
+
+    def __init__(self, backend=BINARY):
+        """Creates an empty priority queue."""
+        self._heap = [ ]
+        self._dict = {}
+        self._timestamp = 0
+
+    def __contains__(self, key):
+        """Returns True if key is one of the values in this queue."""
+        return key in self._dict
+
+    def size(self):
+        """Returns the number of values in this queue."""
+        return len(self._heap)
+
+    def isEmpty(self):
+        """Returns True if this queue contains no elements."""
+        return len(self._heap) == 0
+
+    def clear(self):
+        """Removes all elements from this queue."""
+        self._heap = [ ]
+        self._dict = {}
+
+    def enqueue(self, value, priority=0):
+        """Adds value to this queue using the specified priority."""
+        self._timestamp += 1
+        entry = PriorityQueue._PQEntry(value, priority, self._timestamp)
+        self._heap.append(entry)
+        self._siftUp(len(self._heap) - 1, entry)
+
+    def dequeue(self):
+        """Removes the first element from this queue and returns it."""
+        heap = self._heap
+        if len(heap) == 0:
+            raise IndexError("dequeue called on an empty queue")
+        value = heap[0]._value
+        if self._dict.get(value) == 0:
+            del self._dict[value]
+        last = heap.pop()
+        if len(heap) > 0:
+            self._siftDown(0, last)
+        return value
+
+    def peek(self):
+        """Returns the first item in the queue without removing it."""
+        if len(self._heap) == 0:
+            raise IndexError("peek called on an empty queue")
+        return self._heap[0]._value
+
+    def peekPriority(self):
+        """Returns the priority of the first item in the queue."""
+        if len(self._heap) == 0:
+            raise IndexError("peekPriority called on an empty queue")
+        return self._heap[0]._priority
+
+    def raisePriority(self, value, newPriority):
+        """
+        Raises the priority of the specified value to newPriority.
+        The dictionary that locates values in the heap keeps a single
+        index for each value, so raisePriority requires each value to
+        appear in the queue at most once.
+        """
+        index = self._dict.get(value)
+        if index is None:
+            raise ValueError("raisePriority called with nonexistent value")
+        entry = self._heap[index]
+        if entry._priority < newPriority:
+            raise ValueError("Illegal priority in raisePriority")
+        entry._priority = newPriority
+        self._siftUp(index, entry)
+
+    def raisePriorityOrig(self, value, newPriority):
+        """Raises the priority of the specified value to newPriority."""
+        def findValue(value):
+            for i in range(len(array)):
+                if array[i]._value == value:
+                    return i
+            raise ValueError("raisePriority called with nonexistent value")
+        #   When visiting neighbors of vertex, insert them into heap no matter if they in heap or not. 
+        #When gotten vertex w/ smallest distance from heap, check if it has been removed from heap before. 
+        #If yes, remove this one and continue. Else, mark as removed and visiv all neighbors.
+
+        array = self._heap
+        index = findValue(value)
+        if array[index]._priority < newPriority:
+            raise ValueError("Illegal priority in raisePriority")
+        array[index]._priority = newPriority
+        while index > 0:
+            parent = (index - 1) // 2
+            if array[parent] < array[index]:
+                break
+            array[parent],array[index] = array[index],array[parent]
+            index = parent
+
+# Implementation notes: _siftUp and _siftDown
+# -------------------------------------------
+# The heap is stored in a Python list, which grows by appending and
+# shrinks by popping its last element, so the heap never has to copy
+# its entries into a larger array.  The _siftUp and _siftDown methods
+# restore the heap property after the entry at index has become
+# smaller or larger than its neighbors.  Rather than swapping the
+# entry with each parent or child in turn, they move the entries that
+# are in the way into the hole left by the entry and store the entry
+# only once, at its final position.  Every entry that moves has its
+# new index recorded in self._dict, which maps each value to its index
+# in the heap and allows raisePriority to find a value in constant
+# time rather than by searching the heap.  These two methods account
+# for most of the running time of the queue, so they compare the
+# priorities and timestamps directly instead of calling the less-than
+# operator on each pair of entries.
+
+    def _siftUp(self, index, entry):
+        heap = self._heap
+        indices = self._dict
+        priority = entry._priority
+        timestamp = entry._timestamp
+        while index > 0:
+            parent = (index - 1) >> 1
+            above = heap[parent]
+            if above._priority < priority or (above._priority == priority and
+                                              above._timestamp < timestamp):
+                break
+            heap[index] = above
+            indices[above._value] = index
+            index = parent
+        heap[index] = entry
+        indices[entry._value] = index
+
+    def _siftDown(self, index, entry):
+        heap = self._heap
+        indices = self._dict
+        priority = entry._priority
+        timestamp = entry._timestamp
+        n = len(heap)
+        while True:
+            child = 2 * index + 1
+            if child >= n:
+                break
+            below = heap[child]
+            if child + 1 < n:
+                right = heap[child + 1]
+                if right._priority < below._priority or (
+                        right._priority == below._priority and
+                        right._timestamp < below._timestamp):
+                    child += 1
+                    below = right
+            if priority < below._priority or (priority == below._priority and
+                                              timestamp < below._timestamp):
+                break
+            heap[index] = below
+            indices[below._value] = index
+            index = child
+        heap[index] = entry
+        indices[entry._value] = index
+
+# Implementation notes: _PQEntry
+# ------------------------------
+# This private class combines three values: a value, a priority,
+# and a timestamp.  The timestamp is used to break ties between
+# items of equal priority and therefore ensures that such items
+# obey the standard first-in/first-out queue discipline.  This
+# class implements the less-than operator to simplify priority
+# comparisons.  The __slots__ declaration stores the three fields
+# in the object itself rather than in a dictionary, which makes
+# each entry smaller and each field faster to access.
+
+    class _PQEntry:
+        __slots__ = ("_value", "_priority", "_timestamp")
+        def __init__(self, value, priority, timestamp):
+            self._value = value
+            self._priority = priority
+            self._timestamp = timestamp
+        def __lt__(self, other):
+            if self._priority < other._priority:
+                return True
+            if self._priority > other._priority:
+                return False
+            return self._timestamp < other._timestamp
+
+# Implementation notes: Backends
+# ------------------------------
+# The backend argument to the PriorityQueue constructor chooses the
+# class of the queue it creates, each of which is a subclass of
+# PriorityQueue that supports the same methods.  The BINARY backend is
+# the heap of _PQEntry objects implemented above, in which
+# raisePriority moves an existing entry toward the root.  The LAZY
+# backend never moves an entry once it has been added.  Its heap is
+# kept by the heapq module as a list of (priority, timestamp, value)
+# tuples, and raisePriority simply pushes a new tuple with the lower
+# priority and the same timestamp.  The _live dictionary maps the
+# timestamp of each value still in the queue to its current priority,
+# so any tuple whose priority does not match is stale and is discarded
+# when it reaches the front of the heap.  Because timestamps are never
+# repeated, heapq never has to compare two values, and ties are broken
+# in exactly the same order as in the BINARY backend.  The LAZY backend
+# trades memory for stale tuples against the cost of locating and
+# sifting entries, which makes it the faster choice for algorithms
+# like Dijkstra's that call raisePriority often.  The DARY backend
+# stores the same entries as BINARY but gives each node of the heap
+# arity children, which makes the heap shallower, so that enqueue and
+# raisePriority take fewer steps while dequeue compares more children
+# at each level.  The PAIRING backend is a pairing heap, which is
+# described in the notes for the _PairingPriorityQueue class.  The
+# BUCKET backend, described in the notes for _BucketPriorityQueue,
+# accepts only integer priorities and requires that no priority be
+# smaller than that of the last value dequeued.
+
+class _LazyPriorityQueue(PriorityQueue):
+    """This class implements the LAZY backend for PriorityQueue."""
+
+    def __init__(self, backend=LAZY):
+        """Creates an empty priority queue."""
+        self._heap = [ ]
+        self._live = { }
+        self._dict = { }
+        self._timestamp = 0
+
+    def __contains__(self, key):
+        """Returns True if key is one of the values in this queue."""
+        return key in self._dict
+
+    def size(self):
+        """Returns the number of values in this queue."""
+        return len(self._live)
+
+    def isEmpty(self):
+        """Returns True if this queue contains no elements."""
+        return len(self._live) == 0
+
+    def clear(self):
+        """Removes all elements from this queue."""
+        self._heap = [ ]
+        self._live = { }
+        self._dict = { }
+
+    def enqueue(self, value, priority=0):
+        """Adds value to this queue using the specified priority."""
+        self._timestamp += 1
+        heapq.heappush(self._heap, (priority, self._timestamp, value))
+        self._live[self._timestamp] = priority
+        self._dict[value] = self._timestamp
+
+    def dequeue(self):
+        """Removes the first element from this queue and returns it."""
+        heap = self._heap
+        live = self._live
+        while len(heap) > 0:
+            priority, timestamp, value = heapq.heappop(heap)
+            if live.get(timestamp) == priority:
+                del live[timestamp]
+                if self._dict.get(value) == timestamp:
+                    del self._dict[value]
+                return value
+        raise IndexError("dequeue called on an empty queue")
+
+    def peek(self):
+        """Returns the first item in the queue without removing it."""
+        if not self._discardStale():
+            raise IndexError("peek called on an empty queue")
+        return self._heap[0][2]
+
+    def peekPriority(self):
+        """Returns the priority of the first item in the queue."""
+        if not self._discardStale():
+            raise IndexError("peekPriority called on an empty queue")
+        return self._heap[0][0]
+
+    def raisePriority(self, value, newPriority):
+        """
+        Raises the priority of the specified value to newPriority.
+        If the value has been enqueued more than once, raisePriority
+        applies to its most recent entry.
+        """
+        timestamp = self._dict.get(value)
+        if timestamp is None:
+            raise ValueError("raisePriority called with nonexistent value")
+        oldPriority = self._live[timestamp]
+        if oldPriority < newPriority:
+            raise ValueError("Illegal priority in raisePriority")
+        if oldPriority == newPriority:
+            return
+        self._live[timestamp] = newPriority
+        heapq.heappush(self._heap, (newPriority, timestamp, value))
+
+# Private methods
+
+    def _discardStale(self):
+        """
+        Removes stale tuples from the front of the heap and returns
+        True if the queue is not empty.
+        """
+        heap = self._heap
+        live = self._live
+        while len(heap) > 0:
+            priority, timestamp, value = heap[0]
+            if live.get(timestamp) == priority:
+                return True
+            heapq.heappop(heap)
+        return False
+
+class _DaryPriorityQueue(PriorityQueue):
+    """This class implements the DARY backend for PriorityQueue."""
+
+    def __init__(self, backend=DARY, arity=4):
+        """Creates an empty priority queue whose nodes have arity children."""
+        if type(arity) is not int or arity < 2:
+            raise ValueError("The arity of a heap must be an integer >= 2")
+        PriorityQueue.__init__(self)
+        self._arity = arity
+
+# Private methods
+
+    def _siftUp(self, index, entry):
+        heap = self._heap
+        indices = self._dict
+        arity = self._arity
+        priority = entry._priority
+        timestamp = entry._timestamp
+        while index > 0:
+            parent = (index - 1) // arity
+            above = heap[parent]
+            if above._priority < priority or (above._priority == priority and
+                                              above._timestamp < timestamp):
+                break
+            heap[index] = above
+            indices[above._value] = index
+            index = parent
+        heap[index] = entry
+        indices[entry._value] = index
+
+    def _siftDown(self, index, entry):
+        heap = self._heap
+        indices = self._dict
+        arity = self._arity
+        priority = entry._priority
+        timestamp = entry._timestamp
+        n = len(heap)
+        while True:
+            first = arity * index + 1
+            if first >= n:
+                break
+            child = first
+            below = heap[first]
+            for k in range(first + 1, min(first + arity, n)):
+                other = heap[k]
+                if other._priority < below._priority or (
+                        other._priority == below._priority and
+                        other._timestamp < below._timestamp):
+                    child = k
+                    below = other
+            if priority < below._priority or (priority == below._priority and
+                                              timestamp < below._timestamp):
+                break
+            heap[index] = below
+            indices[below._value] = index
+            index = child
+        heap[index] = entry
+        indices[entry._value] = index
+
+# Implementation notes: _PairingPriorityQueue
+# -------------------------------------------
+# A pairing heap is a tree in which every node is smaller than its
+# children, but in which a node can have any number of children.  The
+# children of a node are kept in a doubly linked list that starts at
+# its child field, and the prev field of each node points to its left
+# sibling or, for a first child, to its parent.  Two trees are merged
+# by making the root that comes later the first child of the other,
+# which takes constant time.  This operation is all that enqueue and
+# raisePriority need: enqueue merges a one-node tree with the root,
+# and raisePriority cuts the subtree whose root is the value out of
+# its parent's list and merges it with the root.  The dequeue method
+# removes the root and combines the list of its children by merging
+# them in pairs from left to right and then merging the results from
+# right to left, which is the step that keeps the amortized cost of
+# dequeue logarithmic.  The nodes are ordered by priority and then by
+# timestamp, just like the entries in the BINARY backend.
+
+class _PairingPriorityQueue(PriorityQueue):
+    """This class implements the PAIRING backend for PriorityQueue."""
+
+    def __init__(self, backend=PAIRING):
+        """Creates an empty priority queue."""
+        self._root = None
+        self._dict = {}
+        self._count = 0
+        self._timestamp = 0
+
+    def size(self):
+        """Returns the number of values in this queue."""
+        return self._count
+
+    def isEmpty(self):
+        """Returns True if this queue contains no elements."""
+        return self._count == 0
+
+    def clear(self):
+        """Removes all elements from this queue."""
+        self._root = None
+        self._dict = {}
+        self._count = 0
+
+    def enqueue(self, value, priority=0):
+        """Adds value to this queue using the specified priority."""
+        self._timestamp += 1
+        node = _PairingPriorityQueue._Node(value, priority, self._timestamp)
+        self._dict[value] = node
+        self._count += 1
+        if self._root is None:
+            self._root = node
+        else:
+            self._root = self._merge(self._root, node)
+
+    def dequeue(self):
+        """Removes the first element from this queue and returns it."""
+        root = self._root
+        if root is None:
+            raise IndexError("dequeue called on an empty queue")
+        if self._dict.get(root._value) is root:
+            del self._dict[root._value]
+        self._count -= 1
+        self._root = self._combineChildren(root)
+        return root._value
+
+    def peek(self):
+        """Returns the first item in the queue without removing it."""
+        if self._root is None:
+            raise IndexError("peek called on an empty queue")
+        return self._root._value
+
+    def peekPriority(self):
+        """Returns the priority of the first item in the queue."""
+        if self._root is None:
+            raise IndexError("peekPriority called on an empty queue")
+        return self._root._priority
+
+    def raisePriority(self, value, newPriority):
+        """
+        Raises the priority of the specified value to newPriority.
+        If the value has been enqueued more than once, raisePriority
+        applies to its most recent entry.
+        """
+        node = self._dict.get(value)
+        if node is None:
+            raise ValueError("raisePriority called with nonexistent value")
+        if node._priority < newPriority:
+            raise ValueError("Illegal priority in raisePriority")
+        node._priority = newPriority
+        if node is self._root:
+            return
+        prev = node._prev
+        if prev._child is node:
+            prev._child = node._sibling
+        else:
+            prev._sibling = node._sibling
+        if node._sibling is not None:
+            node._sibling._prev = prev
+        node._sibling = None
+        node._prev = None
+        self._root = self._merge(self._root, node)
+
+# Private methods
+
+    def _merge(self, a, b):
+        """
+        Merges the trees whose roots are a and b, neither of which has
+        any siblings, and returns the root of the result.
+        """
+        if b._priority < a._priority or (b._priority == a._priority and
+                                         b._timestamp < a._timestamp):
+            a, b = b, a
+        child = a._child
+        b._sibling = child
+        if child is not None:
+            child._prev = b
+        b._prev = a
+        a._child = b
+        return a
+
+    def _combineChildren(self, root):
+        """Returns the tree formed by merging the children of root."""
+        trees = [ ]
+        node = root._child
+        while node is not None:
+            first = node
+            second = node._sibling
+            if second is None:
+                node = None
+            else:
+                node = second._sibling
+                second._sibling = None
+                second._prev = None
+            first._sibling = None
+            first._prev = None
+            if second is not None:
+                first = self._merge(first, second)
+            trees.append(first)
+        if len(trees) == 0:
+            return None
+        result = trees.pop()
+        while len(trees) > 0:
+            result = self._merge(trees.pop(), result)
+        return result
+
+# Implementation notes: _Node
+# ---------------------------
+# This private class holds a value in the pairing heap, along with its
+# priority, its timestamp, and the links described above.
+
+    class _Node:
+        __slots__ = ("_value", "_priority", "_timestamp",
+                     "_child", "_sibling", "_prev")
+        def __init__(self, value, priority, timestamp):
+            self._value = value
+            self._priority = priority
+            self._timestamp = timestamp
+            self._child = None
+            self._sibling = None
+            self._prev = None
+
+# Implementation notes: _BucketPriorityQueue
+# ------------------------------------------
+# The BUCKET backend is the bucket queue used in Dial's version of
+# Dijkstra's algorithm.  The _buckets dictionary maps each priority to
+# a list of (timestamp, value) pairs in the order in which they were
+# added, _floor is the priority of the last value dequeued, and
+# _current is the priority of the bucket that dequeue examines first.
+# Because priorities are integers and no priority is smaller than
+# _floor, dequeue finds the next value by advancing
+# _current one step at a time until it reaches a bucket that is not
+# empty, so that a search whose arc costs are at most C spends O(C)
+# time moving from one distance to the next.  If the gap is longer
+# than the number of buckets, dequeue jumps directly to the smallest
+# priority instead.  As in the LAZY backend, raisePriority adds a new
+# pair to a lower bucket, and the _live dictionary maps the timestamp
+# of each value still in the queue to its current priority so that
+# the old pair can be recognized and skipped.  Values with the same
+# priority are removed in the order in which they reached that
+# priority.  Priorities may be ints or floats with integral values,
+# since the costs read from graph files are floats.
+
+class _BucketPriorityQueue(PriorityQueue):
+    """This class implements the BUCKET backend for PriorityQueue."""
+
+    def __init__(self, backend=BUCKET):
+        """Creates an empty priority queue."""
+        self._buckets = {}
+        self._live = {}
+        self._dict = {}
+        self._floor = -math.inf
+        self._current = 0
+        self._position = 0
+        self._timestamp = 0
+
+    def size(self):
+        """Returns the number of values in this queue."""
+        return len(self._live)
+
+    def isEmpty(self):
+        """Returns True if this queue contains no elements."""
+        return len(self._live) == 0
+
+    def clear(self):
+        """Removes all elements from this queue."""
+        self._buckets = {}
+        self._live = {}
+        self._dict = {}
+        self._floor = -math.inf
+        self._current = 0
+        self._position = 0
+
+    def enqueue(self, value, priority=0):
+        """
+        Adds value to this queue using the specified priority, which
+        must be an integer no smaller than the priority of the last
+        value dequeued.  If the queue is empty, any integer is legal.
+        """
+        if len(self._live) == 0:
+            self._floor = -math.inf
+        index = self._bucketIndex(priority)
+        self._timestamp += 1
+        self._live[self._timestamp] = priority
+        self._dict[value] = self._timestamp
+        bucket = self._buckets.get(index)
+        if bucket is None:
+            self._buckets[index] = [ (self._timestamp, value) ]
+        else:
+            bucket.append((self._timestamp, value))
+
+    def dequeue(self):
+        """Removes the first element from this queue and returns it."""
+        if not self._advance():
+            raise IndexError("dequeue called on an empty queue")
+        timestamp, value = self._buckets[self._current][self._position]
+        self._position += 1
+        self._floor = self._current
+        del self._live[timestamp]
+        if self._dict.get(value) == timestamp:
+            del self._dict[value]
+        return value
+
+    def peek(self):
+        """Returns the first item in the queue without removing it."""
+        if not self._advance():
+            raise IndexError("peek called on an empty queue")
+        return self._buckets[self._current][self._position][1]
+
+    def peekPriority(self):
+        """Returns the priority of the first item in the queue."""
+        if not self._advance():
+            raise IndexError("peekPriority called on an empty queue")
+        timestamp = self._buckets[self._current][self._position][0]
+        return self._live[timestamp]
+
+    def raisePriority(self, value, newPriority):
+        """
+        Raises the priority of the specified value to newPriority.
+        If the value has been enqueued more than once, raisePriority
+        applies to its most recent entry.
+        """
+        timestamp = self._dict.get(value)
+        if timestamp is None:
+            raise ValueError("raisePriority called with nonexistent value")
+        oldPriority = self._live[timestamp]
+        if oldPriority < newPriority:
+            raise ValueError("Illegal priority in raisePriority")
+        if oldPriority == newPriority:
+            return
+        index = self._bucketIndex(newPriority)
+        self._live[timestamp] = newPriority
+        bucket = self._buckets.get(index)
+        if bucket is None:
+            self._buckets[index] = [ (timestamp, value) ]
+        else:
+            bucket.append((timestamp, value))
+
+# Private methods
+
+    def _bucketIndex(self, priority):
+        """
+        Returns priority as an int after checking that it is an integer
+        no smaller than _floor.  If it is smaller than _current, which
+        can happen after peek has moved past empty buckets, _current
+        moves back so that dequeue examines its bucket.
+        """
+        if priority != priority or priority in (math.inf, -math.inf):
+            raise ValueError("Bucket queue priorities must be integers")
+        index = int(priority)
+        if index != priority:
+            raise ValueError("Bucket queue priorities must be integers")
+        if index < self._floor:
+            raise ValueError("Bucket queue priority " + str(priority) +
+                             " is smaller than the last priority dequeued")
+        if index < self._current:
+            self._current = index
+            self._position = 0
+        return index
+
+    def _advance(self):
+        """
+        Moves _current and _position to the first live pair and
+        returns True, or returns False if the queue is empty.
+        """
+        if len(self._live) == 0:
+            return False
+        buckets = self._buckets
+        live = self._live
+        misses = 0
+        while True:
+            bucket = buckets.get(self._current)
+            if bucket is not None:
+                while self._position < len(bucket):
+                    timestamp = bucket[self._position][0]
+                    if live.get(timestamp) == self._current:
+                        return True
+                    self._position += 1
+                del buckets[self._current]
+            self._position = 0
+            misses += 1
+            if misses > len(buckets):
+                self._current = min(buckets)
+                misses = 0
+            else:
+                self._current += 1
+
+_BACKENDS = {
+    BINARY: PriorityQueue,
+    LAZY: _LazyPriorityQueue,
+    DARY: _DaryPriorityQueue,
+    PAIRING: _PairingPriorityQueue,
+    BUCKET: _BucketPriorityQueue,
+}
@@ -0,0 +1,65 @@
+# File: GraphBenchmark.py
+
+"""
+This program measures the running time of the graph traversal
+functions on large synthetic graphs.  The size of the graph can be
+given on the command line as the number of nodes followed by the
+number of arcs, as in
+
+    python GraphBenchmark.py 100000 1000000
+"""
+
+import random
+import sys
+import time
+
+from graph import Graph
+from graphtools import bfs, dfs
+
+def createRandomGraph(nNodes, nArcs, seed=0):
+    """
+    Returns a graph with nNodes nodes and nArcs randomly chosen arcs.
+    The first nNodes - 1 arcs form a chain through all the nodes so
+    that every node is reachable from the first one.
+    """
+    rand = random.Random(seed)
+    g = Graph()
+    nodes = [ g.addNode("N" + str(i)) for i in range(nNodes) ]
+    for i in range(1, nNodes):
+        g.addArc(nodes[i - 1], nodes[i])
+    for i in range(nArcs - (nNodes - 1)):
+        g.addArc(nodes[rand.randrange(nNodes)], nodes[rand.randrange(nNodes)])
+    return g, nodes[0]
+
+def timeFunction(fn):
+    """Calls fn and returns the elapsed time in seconds."""
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def GraphBenchmark(nNodes=100000, nArcs=1000000):
+    print("Building graph with " + str(nNodes) + " nodes and " +
+          str(nArcs) + " arcs")
+    g, start = createRandomGraph(nNodes, nArcs)
+    def countNode(node):
+        nonlocal count
+        count += 1
+    count = 0
+    print("bfs (first run):  %.2f sec" %
+          timeFunction(lambda: bfs(start, countNode)))
+    print("bfs (second run): %.2f sec" %
+          timeFunction(lambda: bfs(start, countNode)))
+    print("dfs:              %.2f sec" %
+          timeFunction(lambda: dfs(start, countNode)))
+    print("getNodes x 10:    %.2f sec" %
+          timeFunction(lambda: [ g.getNodes() for i in range(10) ]))
+    frozen = g.freeze()
+    print("bfs (CSRGraph):   %.2f sec" %
+          timeFunction(lambda: bfs(0, countNode, graph=frozen)))
+    print("dfs (CSRGraph):   %.2f sec" %
+          timeFunction(lambda: dfs(0, countNode, graph=frozen)))
+
+# Startup code
+
+if __name__ == "__main__":
+    GraphBenchmark(*[ int(arg) for arg in sys.argv[1:] ])
@@ -6,9 +6,12 @@ The program starts off with an empty graph and then accepts commands
 the user.
 """
 
+import os
+
 from consoletest import ConsoleTest
 from graph import Graph, Node, Arc
 from graphtools import readGraphData, dfs, bfs
+from graphtools import isGraphSnapshot, loadGraphSnapshot, saveGraphSnapshot
 from tokenscanner import TokenScanner
 
 class GraphConsoleTest(ConsoleTest):
@@ -24,16 +27,17 @@ class GraphConsoleTest(ConsoleTest):
         self.graph.clear()
 
     def loadCommand(self, scanner):
-        """load filename -- Loads the graph data from the file"""
-        filename = scanner.nextToken()
-        ttype = scanner.getTokenType(filename)
-        if ttype == TokenScanner.WORD:
-            filename += ".txt"
-        elif ttype == TokenScanner.STRING:
-            filename = scanner.getStringValue(filename)
+        """load filename -- Loads the graph data or snapshot from the file"""
+        filename = self.scanFilenameToken(scanner, ".graph", ".txt")
+        if isGraphSnapshot(filename):
+            loadGraphSnapshot(filename, self.graph)
         else:
-            print("Illegal file name")            
-        readGraphData(self.graph, filename)
+            readGraphData(self.graph, filename)
+
+    def saveCommand(self, scanner):
+        """save filename -- Saves the graph as a binary snapshot"""
+        filename = self.scanFilenameToken(scanner, ".graph")
+        saveGraphSnapshot(self.graph, filename)
 
     def nodeCommand(self, scanner):
         """node name -- Inserts a node with the specified name"""
@@ -201,6 +205,26 @@ class GraphConsoleTest(ConsoleTest):
 
 # Private functions
 
+    def scanFilenameToken(self, scanner, *extensions):
+        """
+        Reads a filename from the scanner as a single token.  A
+        filename written as a word has the first of the extensions
+        for which a file exists added to it, or the last extension if
+        there is no such file.  A filename written as a quoted string
+        is used as is.
+        """
+        filename = scanner.nextToken()
+        ttype = scanner.getTokenType(filename)
+        if ttype == TokenScanner.WORD:
+            for extension in extensions:
+                if os.path.exists(filename + extension):
+                    break
+            return filename + extension
+        elif ttype == TokenScanner.STRING:
+            return scanner.getStringValue(filename)
+        else:
+            raise SyntaxError("Illegal file name")
+
     def scanNodeName(self, scanner):
         """Reads the name of a node from the scanner."""
         token = scanner.nextToken()
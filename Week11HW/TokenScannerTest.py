@@ -0,0 +1,166 @@
+# File: TokenScannerTest.py
+
+"""
+This program checks that the regular-expression mode of the TokenScanner
+class produces the same tokens, token types, and positions as the
+character-by-character scanner, that reading the same text from a file
+in small chunks makes no difference, and that iterating over a scanner
+reports the position at which each token starts.  It then measures the
+throughput of each mode in tokens per second.
+"""
+
+import io
+import random
+import time
+
+from tokenscanner import TokenScanner
+
+# Each configuration is a list of (method name, arguments) pairs that
+# are applied to a new scanner.
+
+CONFIGURATIONS = [
+    [ ],
+    [ ("ignoreWhitespace", ()) ],
+    [ ("ignoreWhitespace", ()), ("scanNumbers", ()), ("scanStrings", ()),
+      ("addOperator", ("->",)) ],
+    [ ("ignoreWhitespace", ()), ("ignoreComments", ()), ("scanNumbers", ()),
+      ("scanStrings", ()), ("addWordCharacters", ("_$",)),
+      ("addOperator", ("->",)), ("addOperator", ("->>",)),
+      ("addOperator", ("<=",)), ("addOperator", ("/=",)) ],
+    [ ("ignoreComments", ()), ("scanNumbers", ()), ("addOperator", ("\t",)),
+      ("addOperator", ("**",)) ],
+]
+
+SAMPLES = [
+    "",
+    "   ",
+    "A -> B (3)",
+    "A - B (3.5)",
+    "\"121\" -> \"221\"",
+    "undershorts->pants",
+    "ATL (725, 408)",
+    "x = 0x1F + 017 + 0.5e10 + 1e+5 + 2E-3 + 3e + 4e+x + 5.",
+    "1.2.3 00x12 0xg 0. .5 1ee 6e-",
+    "'it''s' \"a\\\"b\" 'c\\x41d' \"\\123\"",
+    "a // comment\nb /* block */ c /*/ d /**/ e /* open",
+    "p /q /= r / ",
+    "->-->->>--> <= < = <==",
+    "tab\tseparated\tvalues ** 2",
+    "name_with$chars and_more",
+    "caf\u00e9 na\u00efve \u00b2 1\u00b2 \u0663\u0664 x\u0663",
+    "\"unterminated",
+]
+
+def createScanner(configuration, regex,
+                  chunkSize=TokenScanner.DEFAULT_CHUNK_SIZE):
+    """Returns a scanner with the specified configuration."""
+    scanner = TokenScanner(chunkSize=chunkSize)
+    for name, args in configuration:
+        getattr(scanner, name)(*args)
+    if regex:
+        scanner.useRegularExpressions()
+    return scanner
+
+def scanAll(scanner, text):
+    """
+    Returns a list of (token, type, position) tuples for the text,
+    ending with either the EOF token or the name of the exception.
+    The hasMoreTokens method is called before each token so that the
+    saveToken path is exercised as well.
+    """
+    scanner.setInput(text)
+    result = [ ]
+    try:
+        while True:
+            more = scanner.hasMoreTokens()
+            token = scanner.nextToken()
+            result.append((more, token, scanner.getTokenType(token),
+                           scanner.getPosition()))
+            if token == "":
+                break
+    except Exception as ex:
+        result.append(type(ex).__name__)
+    return result
+
+def randomText(rand, length):
+    """Returns a random string of characters that stress the scanner."""
+    alphabet = "ab1_$09xXeE.+-/*<=>\"'\\ \t\n\u00e9\u00b2"
+    return "".join(rand.choice(alphabet) for i in range(length))
+
+def checkIterator(scanner, chunked, text):
+    """
+    Returns True if iterating over the scanner produces tokens that
+    appear in the text at the reported positions and the same tokens
+    are produced when the chunked scanner reads the text from a file.
+    """
+    scanner.setInput(text)
+    try:
+        tokens = list(scanner)
+    except Exception:
+        return True
+    for token, type, position in tokens:
+        if text[position:position + len(token)] != token:
+            return False
+    chunked.setInput(io.StringIO(text))
+    return list(chunked) == tokens
+
+def TokenScannerTest():
+    errorcount = 0
+    rand = random.Random(382)
+    texts = SAMPLES + [ randomText(rand, rand.randrange(40))
+                        for i in range(2000) ]
+    for configuration in CONFIGURATIONS:
+        slow = createScanner(configuration, False)
+        fast = createScanner(configuration, True)
+        chunkedScanners = [ createScanner(configuration, regex, 3)
+                            for regex in [ False, True ] ]
+        fileScanners = [ createScanner(configuration, True, size)
+                         for size in range(1, 6) ]
+        for text in texts:
+            expected = scanAll(slow, text)
+            if scanAll(fast, text) != expected:
+                errorcount += 1
+                print("Mismatch for " + repr(text) + " with " +
+                      str(configuration))
+            fileScanner = fileScanners[len(text) % 5]
+            if scanAll(fileScanner, io.StringIO(text)) != expected:
+                errorcount += 1
+                print("File mismatch for " + repr(text) + " with " +
+                      str(configuration))
+            for scanner, chunked in zip([ slow, fast ], chunkedScanners):
+                if not checkIterator(scanner, chunked, text):
+                    errorcount += 1
+                    print("Iterator mismatch for " + repr(text) + " with " +
+                          str(configuration))
+    if errorcount == 0:
+        print("TokenScannerTest succeeded")
+    else:
+        print("TokenScannerTest failed")
+
+def TokenScannerBenchmark(nLines=20000):
+    rand = random.Random(0)
+    lines = [ "N" + str(rand.randrange(100000)) + " -> N" +
+              str(rand.randrange(100000)) + " (" + str(rand.randrange(1000)) +
+              ")" for i in range(nLines) ]
+    text = " ".join(lines)
+    for regex in [ False, True ]:
+        mode = "regular expressions" if regex else "characters"
+        for source in [ "string", "file" ]:
+            scanner = createScanner(CONFIGURATIONS[2], regex)
+            if source == "string":
+                scanner.setInput(text)
+            else:
+                scanner.setInput(io.StringIO(text))
+            count = 0
+            start = time.perf_counter()
+            for token in scanner:
+                count += 1
+            elapsed = time.perf_counter() - start
+            print((mode + " (" + source + ")").ljust(30) +
+                  str(int(count / elapsed)) + " tokens/sec")
+
+# Startup code
+
+if __name__ == "__main__":
+    TokenScannerTest()
+    TokenScannerBenchmark()
@@ -123,6 +123,7 @@ class ConsoleTest:
         scanner.ignoreWhitespace()
         scanner.scanNumbers()
         scanner.scanStrings()
+        scanner.useRegularExpressions()
         return scanner
 
     def getPrompt(self):
@@ -2,20 +2,26 @@
 
 """
 This module defines the classes Graph, Node, and Arc, which are
-used for working with graphs.
+used for working with graphs, along with the class CSRGraph, which
+stores a frozen copy of a graph in a compact array-based form.
 """
 
+from collections import deque
+import struct
+
 class Graph:
     """Defines a graph as a set of nodes and a set of arcs."""
 
     def __init__(self):
         """Creates an empty graph."""
+        self._version = 0
         self.clear()
 
     def clear(self):
         """Removes all the nodes and arcs from the graph."""
         self._nodes = { }
         self._arcs = set()
+        self._invalidate()
 
     def addNode(self, arg):
         """
@@ -34,7 +40,9 @@ class Graph:
             node = arg
         else:
             raise ValueError("Illegal node specification")
-        self._nodes[node.getName()] = node
+        if self._nodes.get(node.getName()) is not node:
+            self._nodes[node.getName()] = node
+            self._invalidate()
         return node
 
     def addArc(self, a1, a2=None):
@@ -56,6 +64,7 @@ class Graph:
         self._arcs.add(arc)
         arc.getStart()._addArcFrom(arc)
         arc.getFinish()._addArcTo(arc)
+        self._invalidate()
         return arc
 
     def removeNode(self, arg):
@@ -71,71 +80,44 @@ class Graph:
         else:
             raise ValueError("Illegal node specification")
         
-        for n in self.getNodes():
-            if n != node and node.isConnectedTo(n):
-                self.removeArc(node, n)
-        #node._arcsTo = set()
-        #node._arcsFrom = set()
-        #if node in self._nodes:
-        #    raise ValueError("????h uh???")
-        #graphnodes = self.getNodes()
+        for arc in node._arcsFrom | node._arcsTo:
+            self._detachArc(arc)
         del self._nodes[node.getName()]
+        self._invalidate()
 
 
     def removeArc(self, a1, a2=None):
         """ Removes an arc from the graph. """
         #Arguments can be either a single Arc object or a pair of nodes, either as node objects or strings.
         #Removing an arc from a graph should leave the set of nodes unchanged, even if leaving an arc leaves a node isolated. 
-        
-        #if a1 and a2 are both arcs
 
         if a1 is None and a2 is None:
             raise ValueError("Illegal arc specification")
-        else:
-            if isinstance(a1, Arc) and a2 is None:
-                arc = a1
-            else: #Both a1 and a2 are nodes, either in string or node form
-                if type(a1) is str:
-                    node1 = self.findNode(a1)
-                else:
-                    node1 = a1
-                if type(a2) is str:
-                    node2 = self.findNode(a2)
-                else:
-                    node2 = a2
-                if node1.isConnectedTo(node2):#Need to get an arc... without creating it. 
-                    arc = None
-                    for a in self._arcs:
-                        if (a.getStart() == node1 and a.getFinish() == node2) or (a.getStart() == node2 and a.getFinish() == node1):
-                            arc = a
-            if arc == None:
-                raise ValueError("Illegal arc specification")
-                #Once arc was found in either case, go about process of removing arc from each node and the graph as a whole
-            startnode = arc.getStart()
-            endnode = arc.getFinish()
-            
-
-            if arc in startnode.getArcsFrom():
-                startnode._arcsFrom.remove(arc)
-
-            if arc in endnode.getArcsTo():
-                endnode._arcsTo.remove(arc)
-            ###
-            #THIS SECTION BELOW IS TO GET RID OF A MULTI-DIRECTIONAL ARC.
-            #Comment this section out if you just want to delete a bi-directional arc one way.
-
-            antiArc = None #get the arc from endnode to startnode
-            for m in endnode.getArcs():
-                holdfinish = m.getFinish()
-                if holdfinish == startnode:
-                    antiArc = m
-            if antiArc != None:
-                startnode._arcsTo.remove(antiArc)
-                endnode._arcsFrom.remove(antiArc)
-                self._arcs.remove(antiArc)
-            ###
-
-            self._arcs.remove(arc)
+        if isinstance(a1, Arc) and a2 is None:
+            arc = a1
+        else: #Both a1 and a2 are nodes, either in string or node form
+            arc = self.getArc(a1, a2)
+        if arc is None or arc not in self._arcs:
+            raise ValueError("Illegal arc specification")
+        #Once arc was found in either case, go about process of removing arc from each node and the graph as a whole
+        startnode = arc.getStart()
+        endnode = arc.getFinish()
+        self._detachArc(arc)
+        ###
+        #THIS SECTION BELOW IS TO GET RID OF A MULTI-DIRECTIONAL ARC.
+        #Comment this section out if you just want to delete a bi-directional arc one way.
+
+        antiArc = endnode._findArcTo(startnode) #get the arc from endnode to startnode
+        if antiArc != None:
+            self._detachArc(antiArc)
+        ###
+        self._invalidate()
+
+    def _detachArc(self, arc):
+        """Removes an arc from the graph and from both of its nodes."""
+        self._arcs.remove(arc)
+        arc.getStart()._removeArcFrom(arc)
+        arc.getFinish()._removeArcTo(arc)
 
     def findNode(self, name):
         """Returns the node with the specified name, or None."""
@@ -143,58 +125,125 @@ class Graph:
 
     def getNodes(self):
         """Returns a sorted list of all the nodes in the graph."""
-        return [ node for node in sorted(self._nodes.values()) ]
+        if self._sortedNodes is None:
+            self._sortedNodes = sorted(self._nodes.values())
+        return list(self._sortedNodes)
 
     def getArcs(self):
         """Returns a sorted list of all the arcs in the graph."""
-        return [ arc for arc in sorted(self._arcs) ]
+        if self._sortedArcs is None:
+            self._sortedArcs = sorted(self._arcs)
+        return list(self._sortedArcs)
 
-    def KahnsAlgorithm(self):
-        #Works be choosing vertices in the same order as the eventual topological sort. 
-        #First, find a list of "start nodes" which have no incoming edges and insert them into a set S, at lea
-        emptyset = [] #L ← Empty list that will contain the sorted elements
-        setofallwithnoedge = set()#S ← Set of all nodes with no incoming edge
-        for x in self.getNodes(): #Get a node x from list of nodes
-            if len(x.getArcsTo()) == 0:
-                setofallwithnoedge.add(x)
-
-        #print(setofallwithnoedge)
-        #print(self.getArcs())
-        #print(emptyset)
-
-        while len(setofallwithnoedge) != 0:
-            holdnode = setofallwithnoedge.pop()
-            emptyset.append(holdnode.getName())
-            holdarcs = holdnode.getArcsFrom()
-            for e in holdarcs:
-                m = e.getFinish()
-                #del arc that starts at n and ends at m
-                self.removeArc(holdnode, m)
-                if len(m.getArcsTo()) == 0:
-                    setofallwithnoedge.add(m)
-        
+    def getArc(self, n1, n2):
+        """
+        Returns an arc from n1 to n2, or None if no such arc exists.
+        Each of n1 and n2 can be a Node object or the name of a node.
+        If there are parallel arcs, getArc returns the first one added.
+        """
+        if type(n1) is str:
+            n1 = self.findNode(n1)
+        if type(n2) is str:
+            n2 = self.findNode(n2)
+        if n1 is None or n2 is None:
+            return None
+        return n1._findArcTo(n2)
+
+    def getVersion(self):
+        """
+        Returns an integer that changes whenever a node or arc is added
+        to or removed from the graph.  Changing the cost of an existing
+        arc does not change the version.
+        """
+        return self._version
 
-        #print(setofallwithnoedge)
-        #print(self.getArcs())
-        #print(emptyset)
+    def iterNodes(self):
+        """Returns an iterator over the nodes in no particular order."""
+        return iter(self._nodes.values())
 
-        if len(self.getArcs()) != 0:
-            raise ValueError("GRAPH HAS AT LEAST ONE CYCLE")
-        else:
-            return emptyset
-            
-
-        #while S is non-empty:
-        #    remove a node n from S
-        #    add n to tail of L
-        #    for each node m with an edge e from n to m do
-        #        remove edge e from the graph
-        #        if m has no other incoming edges then
-        #            insert m into S
-        #if graph has edges then
-        #    return error   (graph has at least one cycle)
-        #else 
-        #    return L   (a topologically sorted order)
+    def iterArcs(self):
+        """Returns an iterator over the arcs in no particular order."""
+        return iter(self._arcs)
+
+    def freeze(self):
+        """
+        Returns a CSRGraph containing the current nodes and arcs in a
+        compact array-based form.  The CSRGraph is a snapshot, so later
+        changes to this graph are not reflected in the result.
+        """
+        nodes = self.getNodes()
+        index = { node: i for i, node in enumerate(nodes) }
+        offsets = [ 0 ]
+        targets = [ ]
+        costs = [ ]
+        for node in nodes:
+            for arc in node.getArcsFrom():
+                targets.append(index[arc.getFinish()])
+                costs.append(arc.getCost())
+            offsets.append(len(targets))
+        return CSRGraph(nodes, offsets, targets, costs)
+
+    def KahnsAlgorithm(self):
+        """Returns a list of the node names in topological order."""
+        return [ node.getName() for node in self.topologicalSort() ]
+
+# Implementation notes: topologicalSort
+# -------------------------------------
+# This method implements Kahn's algorithm without removing any arcs.
+# Instead of deleting the arcs that leave each node as it is output,
+# the implementation keeps a count of the unprocessed arcs that end at
+# each node and decrements the count for each finish node.  A node is
+# ready once its count reaches zero.  Because every arc is examined
+# once, the algorithm runs in O(V + E) time.  If some nodes are never
+# ready, each of them has an incoming arc from another such node, so
+# following those arcs backward must eventually repeat a node, which
+# identifies a cycle to report.
+
+    def topologicalSort(self):
+        """
+        Returns a generator that produces the nodes of the graph in
+        topological order without changing the graph.  If the graph
+        contains a cycle, the generator raises a CycleError after
+        producing the nodes that do not depend on that cycle.  The
+        graph must not be changed while the generator is in use.
+        """
+        inDegree = { }
+        ready = deque()
+        for node in self._nodes.values():
+            inDegree[node] = len(node._arcsTo)
+            if inDegree[node] == 0:
+                ready.append(node)
+        count = 0
+        while len(ready) > 0:
+            node = ready.popleft()
+            count += 1
+            yield node
+            for finish, arcs in node._arcIndex.items():
+                inDegree[finish] -= len(arcs)
+                if inDegree[finish] == 0:
+                    ready.append(finish)
+        if count < len(self._nodes):
+            raise CycleError(self._findCycle(inDegree))
+
+    def _findCycle(self, inDegree):
+        """Returns a cycle among the nodes whose inDegree is nonzero."""
+        node = None
+        for candidate, degree in inDegree.items():
+            if degree > 0:
+                node = candidate
+                break
+        path = [ ]
+        position = { }
+        while node not in position:
+            position[node] = len(path)
+            path.append(node)
+            for arc in node.iterArcsTo():
+                if inDegree[arc.getStart()] > 0:
+                    node = arc.getStart()
+                    break
+        cycle = path[position[node]:]
+        cycle.reverse()
+        return cycle
 
 
 # Implementation notes: Factory methods
@@ -213,11 +262,41 @@ class Graph:
         """Returns a Arc between the specified nodes."""
         return Arc(start, finish)
 
+    def requiresNodesFirst(self):
+        """
+        Returns True if every node must be defined before any arcs are
+        added.  The readGraphData function uses this method to decide
+        whether to hold back the arcs in a file until it has read all
+        the nodes.  Subclasses whose representation depends on knowing
+        the complete set of nodes should override it to return True.
+        """
+        return False
+
+# Implementation notes: Sorted-order caches
+# -----------------------------------------
+# The getNodes and getArcs methods return their results in sorted
+# order, which is expensive to compute on every call.  The Graph
+# and Node classes therefore keep the most recent sorted lists and
+# discard them whenever a node or arc is added or removed.  Each call
+# still returns a fresh copy so that clients can change the graph
+# while iterating over the result.  Clients that do not need sorted
+# order can use the iter methods, which avoid the copy entirely but
+# must not be used while the graph is being changed.  The same method
+# also advances the version number returned by getVersion, which lets
+# clients that keep results computed from the graph, such as the
+# AllPairsIndex class in FloydWarshall.py, tell when to discard them.
+
+    def _invalidate(self):
+        """Discards the sorted-order caches after a change."""
+        self._sortedNodes = None
+        self._sortedArcs = None
+        self._version += 1
+
 # Overload standard methods
 
     def __str__(self):
         s = ""
-        for arc in getArcs():
+        for arc in self.getArcs():
             if len(s) > 0:
                 s += ", "
             s += str(arc)
@@ -226,6 +305,21 @@ class Graph:
     def __len__(self):
         return len(self._nodes)
 
+# Implementation notes: CycleError class
+# --------------------------------------
+# The CycleError exception is raised by operations that require the
+# graph to be acyclic.  It is a subclass of ValueError so that existing
+# code that catches ValueError continues to work, and it records the
+# offending cycle as a list of nodes in its cycle attribute.
+
+class CycleError(ValueError):
+    """Indicates that a graph contains a cycle."""
+
+    def __init__(self, cycle):
+        self.cycle = cycle
+        names = [ node.getName() for node in cycle + cycle[:1] ]
+        ValueError.__init__(self, "Graph has a cycle: " + " -> ".join(names))
+
 # Implementation notes: Node class
 # --------------------------------
 # The Node class represents a single node in a graph, which is
@@ -242,6 +336,9 @@ class Node:
         self._name = name
         self._arcsFrom = set()
         self._arcsTo = set()
+        self._sortedArcsFrom = None
+        self._sortedArcsTo = None
+        self._arcIndex = { }
 
     def getName(self):
         """Returns the name of this node."""
@@ -253,25 +350,34 @@ class Node:
 
     def getArcsFrom(self):
         """Returns a list of all the arcs leaving this node."""
-        return [ arc for arc in sorted(self._arcsFrom) ]
+        if self._sortedArcsFrom is None:
+            self._sortedArcsFrom = sorted(self._arcsFrom)
+        return list(self._sortedArcsFrom)
 
     def getArcsTo(self):
         """Returns a list of all the arcs ending at this node."""
-        return [ arc for arc in sorted(self._arcsTo) ]
+        if self._sortedArcsTo is None:
+            self._sortedArcsTo = sorted(self._arcsTo)
+        return list(self._sortedArcsTo)
+
+    def iterArcsFrom(self):
+        """Returns an iterator over the arcs leaving this node."""
+        return iter(self._arcsFrom)
+
+    def iterArcsTo(self):
+        """Returns an iterator over the arcs ending at this node."""
+        return iter(self._arcsTo)
 
     def getNeighbors(self):
         """Returns a list of the nodes to which arcs exist."""
         targets = set()
         for arc in self._arcsFrom:
             targets.add(arc.getFinish())
-        return [ node for node in sorted(targets) ]
+        return sorted(targets)
 
     def isConnectedTo(self, node):
         """Returns True if any arcs connects to node."""
-        for arc in self._arcsFrom:
-            if arc.getFinish() is node:
-                return True
-        return False
+        return node in self._arcIndex
 
 # Package methods called only by the Graph class
 
@@ -279,13 +385,46 @@ class Node:
         """Adds an arc that starts at this node."""
         if arc.getStart() is not self:
             raise ValueError("Arc must start at the specified node")
-        self._arcsFrom.add(arc)
+        if arc not in self._arcsFrom:
+            self._arcsFrom.add(arc)
+            self._arcIndex.setdefault(arc.getFinish(), [ ]).append(arc)
+            self._sortedArcsFrom = None
 
     def _addArcTo(self, arc):
         """Adds an arc that finishes at this node."""
         if arc.getFinish() is not self:
             raise ValueError("Arc must end at the specified node")
         self._arcsTo.add(arc)
+        self._sortedArcsTo = None
+
+    def _removeArcFrom(self, arc):
+        """Removes an arc that starts at this node."""
+        self._arcsFrom.remove(arc)
+        arcs = self._arcIndex[arc.getFinish()]
+        arcs.remove(arc)
+        if len(arcs) == 0:
+            del self._arcIndex[arc.getFinish()]
+        self._sortedArcsFrom = None
+
+    def _removeArcTo(self, arc):
+        """Removes an arc that finishes at this node."""
+        self._arcsTo.remove(arc)
+        self._sortedArcsTo = None
+
+    def _findArcTo(self, node):
+        """Returns the first arc from this node to node, or None."""
+        arcs = self._arcIndex.get(node)
+        if arcs is None:
+            return None
+        return arcs[0]
+
+# Implementation notes: Arc index
+# -------------------------------
+# In addition to the set of outgoing arcs, each node keeps a dictionary
+# that maps each finish node to the list of arcs that lead there, in
+# the order in which they were added.  A list is used because a graph
+# may contain parallel arcs between the same pair of nodes.  This index
+# allows isConnectedTo and Graph.getArc to run in constant time.
 
 # Implementation notes: scanOptions
 # ---------------------------------
@@ -296,11 +435,21 @@ class Node:
 # options string is ignored.  Subclasses that need to specify
 # different attributes should overload this method so that the
 # options string includes the information appropriate to the
-# particular application.
+# particular application.  The formatOptions method performs the
+# inverse operation and is used when a graph is written to a file.
+# Subclasses that overload scanOptions should also overload
+# formatOptions so that the attributes survive being saved.
 
     def scanOptions(self, options):
         """Scans the options string on a node definition line."""
 
+    def formatOptions(self):
+        """
+        Returns the options string that scanOptions would read to
+        recreate the attributes of this node, or None if there is none.
+        """
+        return None
+
 # Overload standard methods
 
     def __str__(self):
@@ -420,3 +569,164 @@ class Arc:
 
     def __le__(self, other):
         return self is other or self < other
+
+# Implementation notes: CSRGraph class
+# ------------------------------------
+# The CSRGraph class stores a frozen graph in compressed-sparse-row
+# form.  Nodes are identified by integer indices that match their
+# positions in the sorted list returned by getNodes.  The arcs that
+# leave node i occupy positions offsets[i] through offsets[i + 1] - 1
+# of the parallel arrays targets and costs, in the same order in which
+# getArcsFrom returns them, so that algorithms running on a CSRGraph
+# visit nodes in the same order as they do on the original Graph.
+# Each array is a typed memoryview over packed machine words, which
+# stores an arc in 16 bytes rather than in an Arc object and two set
+# entries.  The costs are stored as 8-byte integers if every cost is
+# an int that fits in that size and as 8-byte floating-point values
+# otherwise.  In the second case, getArcsFrom returns every cost as a
+# float, so a cost of 3 comes back as 3.0, and integers larger than
+# 2**53 may lose precision.  The standard array module is not used
+# here because the course array.py module hides it in some of these
+# directories.  The reverse arrays used by getArcsTo are computed the
+# first time they are needed.
+
+class CSRGraph:
+    """Defines an immutable graph stored in compressed-sparse-row form."""
+
+    def __init__(self, nodes, offsets, targets, costs):
+        """
+        Creates a CSRGraph from a sorted list of nodes and the offset,
+        target, and cost arrays described in the implementation notes.
+        """
+        self._nodes = list(nodes)
+        self._index = None
+        self._offsets = _typedArray("q", offsets)
+        self._targets = _typedArray("q", targets)
+        if not isinstance(costs, memoryview):
+            costs = list(costs)
+        self._costs = _typedArray(_getCostTypecode(costs), costs)
+        self._reverse = None
+
+    def getNodes(self):
+        """Returns a sorted list of all the nodes in the graph."""
+        return list(self._nodes)
+
+    def getNode(self, index):
+        """Returns the node with the specified index."""
+        return self._nodes[index]
+
+    def findNode(self, name):
+        """Returns the node with the specified name, or None."""
+        index = self._getIndex().get(name)
+        if index is None:
+            return None
+        return self._nodes[index]
+
+    def indexOf(self, arg):
+        """
+        Returns the index of a node, which can be specified as an
+        integer index, a Node object, or the name of the node.
+        """
+        if type(arg) is int:
+            if 0 <= arg < len(self._nodes):
+                return arg
+        else:
+            if isinstance(arg, Node):
+                arg = arg.getName()
+            index = self._getIndex().get(arg)
+            if index is not None:
+                return index
+        raise ValueError("Illegal node specification")
+
+    def getArcCount(self):
+        """Returns the number of arcs in the graph."""
+        return len(self._targets)
+
+    def getOffsets(self):
+        """Returns the array of arc offsets, which has one extra entry."""
+        return self._offsets
+
+    def getTargets(self):
+        """Returns the array of finish indices for each arc."""
+        return self._targets
+
+    def getCosts(self):
+        """Returns the array of costs for each arc."""
+        return self._costs
+
+    def getArcsFrom(self, index):
+        """
+        Returns an iterator over (finish, cost) pairs for the arcs that
+        leave the node with the specified index.
+        """
+        first = self._offsets[index]
+        last = self._offsets[index + 1]
+        return zip(self._targets[first:last], self._costs[first:last])
+
+    def getArcsTo(self, index):
+        """
+        Returns an iterator over (start, cost) pairs for the arcs that
+        end at the node with the specified index.
+        """
+        offsets, sources, costs = self._getReverse()
+        first = offsets[index]
+        last = offsets[index + 1]
+        return zip(sources[first:last], costs[first:last])
+
+# Private methods
+
+    def _getIndex(self):
+        if self._index is None:
+            self._index = { node.getName(): i
+                            for i, node in enumerate(self._nodes) }
+        return self._index
+
+    def _getReverse(self):
+        if self._reverse is None:
+            n = len(self._nodes)
+            offsets = self._offsets
+            targets = self._targets
+            counts = [ 0 ] * (n + 1)
+            for finish in targets:
+                counts[finish + 1] += 1
+            for i in range(n):
+                counts[i + 1] += counts[i]
+            reverseOffsets = list(counts)
+            sources = [ 0 ] * len(targets)
+            costs = [ 0 ] * len(targets)
+            for start in range(n):
+                for k in range(offsets[start], offsets[start + 1]):
+                    finish = targets[k]
+                    slot = counts[finish]
+                    sources[slot] = start
+                    costs[slot] = self._costs[k]
+                    counts[finish] = slot + 1
+            self._reverse = (_typedArray("q", reverseOffsets),
+                             _typedArray("q", sources),
+                             _typedArray(self._costs.format, costs))
+        return self._reverse
+
+# Overload standard methods
+
+    def __len__(self):
+        return len(self._nodes)
+
+def _getCostTypecode(costs):
+    """
+    Returns "q" if every cost is an int that fits in 8 bytes and "d"
+    otherwise.  A memoryview of costs keeps its own format.
+    """
+    if isinstance(costs, memoryview):
+        return costs.format
+    for cost in costs:
+        if type(cost) is not int or not -2**63 <= cost < 2**63:
+            return "d"
+    return "q"
+
+def _typedArray(typecode, values):
+    """Returns a memoryview of the specified struct type holding values."""
+    if isinstance(values, memoryview) and values.format == typecode:
+        return values
+    values = list(values)
+    data = struct.pack(str(len(values)) + typecode, *values)
+    return memoryview(data).cast(typecode)
@@ -3,74 +3,152 @@
 """
 This module defines the following tools for graphs:
 
-  readGraphData(g, file)  Loads graph data from the specified file
+  readGraphData(g, file)  Loads graph data from a file or lines
+  saveGraphSnapshot(g, file)  Saves the graph in binary snapshot form
+  loadGraphSnapshot(file)     Loads a graph from a binary snapshot
   bfs(start, fn)          Conducts a breadth-first search from start
+  bfsIter(start)          Generates the nodes in breadth-first order
   dfs(start, fn)          Conducts a depth-first search from start
   dfs(g, fn)              Applies depth-first search to the entire graph
+
+The traversal functions also accept a CSRGraph produced by Graph.freeze,
+either as the graph argument to dfs or through the graph keyword, which
+identifies the CSRGraph in which the start node is found.
 """
 
-from graph import Graph, Node, Arc
+from graph import Graph, Node, Arc, CSRGraph
 from tokenscanner import TokenScanner
+from collections import deque
 from inspect import signature
+import mmap
+import re
+import struct
 
 # Implementation notes: readGraphData
 # -----------------------------------
-# This function makes two passes over the data file, a "prescan" phase
-# that defines the nodes names and a "scan" phase that rereads the data,
-# interprets any options, and then updates the graph structure.  The
-# purpose of this design is to allow the same data files to work with
-# different graph representations, some of which require the nodes to
-# be defined before processing the arc information.
-
-def readGraphData(g, filename):
+# This function reads the data in a single pass.  Most lines have one
+# of the simple forms
+#
+#     A
+#     A (options)
+#     A -> B (cost)
+#     A - B (cost)
+#
+# in which the names are either identifiers or quoted strings without
+# escape sequences.  Those lines are recognized using a single regular
+# expression, and only the lines that do not match are handed to the
+# TokenScanner, which interprets them exactly as before.  Some graph
+# representations require the nodes to be defined before processing
+# the arc information.  For a graph whose requiresNodesFirst method
+# returns True, readGraphData adds the nodes as it encounters them but
+# saves the arcs in a list and adds them after it reaches the end of
+# the data.  For other graphs, the arcs are added immediately.
+
+GRAPH_NAME = r"""([A-Za-z][A-Za-z0-9]*|"[^"\\]*"|'[^'\\]*')"""
+GRAPH_LINE_PATTERN = re.compile(GRAPH_NAME + r"\s*(?:(->|-)\s*" +
+                                GRAPH_NAME + r"\s*)?(?:\((.*)\))?$")
+
+def readGraphData(g, source):
     """
-    Reads graph data from the specified file.  The lines in the file
-    take one of two forms: (1) a node specification containing the
-    name of the node or (2) an arc specification that includes two
-    node names separated either by an operator indicating the type
-    of the arc.  The operator -> specifies a directed arc, and the
-    operator - specifies an undirected arc, which is implemented as
+    Reads graph data from the specified source, which is either the
+    name of a file, a file object, or any iterator that produces
+    lines.  The lines take one of two forms: (1) a node specification
+    containing the name of the node or (2) an arc specification that
+    includes two node names separated either by an operator indicating
+    the type of the arc.  The operator -> specifies a directed arc, and
+    the operator - specifies an undirected arc, which is implemented as
     one arc in each direction.  Either form may be followed in the
     file by an option string enclosed in parentheses, which is used
     to initialize the attributes of the specific Node or Arc subclass.
     The format of these option strings is defined by the subclass.
     """
+    if type(source) is str:
+        with open(source) as f:
+            readGraphLines(g, f)
+    else:
+        readGraphLines(g, source)
+
+def readGraphLines(g, lines):
+    """Reads graph data from an iterator over lines."""
+    scanner = None
+    deferred = None
+    if g.requiresNodesFirst():
+        deferred = [ ]
+    for line in lines:
+        line = line.strip()
+        if line != "" and not line.startswith("#"):
+            match = GRAPH_LINE_PATTERN.match(line)
+            if match is None:
+                if scanner is None:
+                    scanner = createGraphScanner()
+                name1, op, name2, options = scanGraphLine(scanner, line)
+            else:
+                name1, op, name2, options = match.groups()
+                name1 = unquoteName(name1)
+                if name2 is not None:
+                    name2 = unquoteName(name2)
+            n1 = g.addNode(name1)
+            if op is None:
+                if options is not None:
+                    n1.scanOptions(options)
+            else:
+                n2 = g.addNode(name2)
+                if deferred is None:
+                    addGraphArcs(g, n1, op, n2, options)
+                else:
+                    deferred.append((n1, op, n2, options))
+    if deferred is not None:
+        for n1, op, n2, options in deferred:
+            addGraphArcs(g, n1, op, n2, options)
+
+def addGraphArcs(g, n1, op, n2, options):
+    """Adds the arcs specified by the operator op between n1 and n2."""
+    arc = g.addArc(n1, n2)
+    if options is not None:
+        arc.scanOptions(options)
+    if op == "-":
+        arc = g.addArc(n2, n1)
+        if options is not None:
+            arc.scanOptions(options)
+
+def createGraphScanner():
+    """Returns a TokenScanner configured for reading graph data."""
     scanner = TokenScanner()
     scanner.ignoreWhitespace()
     scanner.scanNumbers()
     scanner.scanStrings()
     scanner.addOperator("->")
-    for phase in ["prescan", "scan"]:
-        with open(filename) as f:
-            for line in f:
-                line = line.strip()
-                if line != "" and not line.startswith("#"):
-                    scanner.setInput(line)
-                    n1 = g.addNode(scanNodeName(scanner))
-                    token = scanner.nextToken()
-                    if token == "-" or token == "->":
-                        op = token
-                        n2 = g.addNode(scanNodeName(scanner))
-                        token = scanner.nextToken()
-                    else:
-                        op = None
-                    if phase == "scan":
-                        options = None
-                        if token == "(":
-                            p1 = scanner.getPosition()
-                            p2 = line.rfind(")")
-                            options = line[p1:p2]
-                        if op is None:
-                            if options is not None:
-                                n1.scanOptions(options)
-                        else:
-                            arc = g.addArc(n1, n2)
-                            if options is not None:
-                                arc.scanOptions(options)
-                            if op == "-":
-                                arc = g.addArc(n2, n1)
-                                if options is not None:
-                                    arc.scanOptions(options)
+    scanner.useRegularExpressions()
+    return scanner
+
+def scanGraphLine(scanner, line):
+    """
+    Uses the scanner to divide a line of graph data into a tuple of
+    the form (name1, op, name2, options), in which each of op, name2,
+    and options is None if it does not appear on the line.
+    """
+    scanner.setInput(line)
+    name1 = scanNodeName(scanner)
+    token = scanner.nextToken()
+    if token == "-" or token == "->":
+        op = token
+        name2 = scanNodeName(scanner)
+        token = scanner.nextToken()
+    else:
+        op = None
+        name2 = None
+    options = None
+    if token == "(":
+        p1 = scanner.getPosition()
+        p2 = line.rfind(")")
+        options = line[p1:p2]
+    return (name1, op, name2, options)
+
+def unquoteName(name):
+    """Removes the quotation marks, if any, from a matched node name."""
+    if name[0] == '"' or name[0] == "'":
+        return name[1:-1]
+    return name
 
 def scanNodeName(scanner):
     """Reads the name of a node from the scanner."""
@@ -81,15 +159,165 @@ def scanNodeName(scanner):
     elif ttype == TokenScanner.STRING:
         return scanner.getStringValue(token)
 
+# Implementation notes: Graph snapshots
+# -------------------------------------
+# A snapshot stores the CSRGraph form of a graph in a binary file that
+# can be loaded without any parsing.  The file begins with a header
+#
+#     magic     8 bytes   b"GRAPHSNP"
+#     version   4 bytes   SNAPSHOT_VERSION
+#     marker    4 bytes   SNAPSHOT_MARKER, to detect the byte order
+#     n         8 bytes   the number of nodes
+#     m         8 bytes   the number of arcs
+#     nameSize  8 bytes   the number of bytes of node names
+#     optSize   8 bytes   the number of bytes of node options
+#     costType  8 bytes   the typecode of the costs, b"q" or b"d"
+#
+# which is followed by the arrays nameOffsets, optionOffsets, and
+# offsets, each with n + 1 entries, then the arrays targets and costs,
+# each with m entries, and finally the UTF-8 encoded node names and
+# node option strings.  The integer arrays use 8-byte signed integers
+# and the costs use the CSRGraph cost format, which is either 8-byte
+# integers or 8-byte floating-point values, all in the native byte
+# order, so the arrays in a memory-mapped file can be used by a
+# CSRGraph directly.  The node options are the strings returned by
+# Node.formatOptions.  Arcs store only their costs.  When a snapshot
+# with floating-point costs is loaded into an existing graph, costs
+# with integral values are turned back into integers, so that a graph
+# that mixes integer and floating-point costs keeps its integers after
+# it is saved and loaded.  The data is then copied
+# into the graph and the mapping is closed.  Only a CSRGraph keeps the
+# mapping open, because its arrays refer to it.  The nodes of a loaded
+# CSRGraph are created by the createNode method of the graph class
+# passed as factory, which must be the class of the graph that was
+# saved, such as GeoGraph, for the node options to be read back.
+
+SNAPSHOT_MAGIC = b"GRAPHSNP"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_MARKER = 0x01020304
+SNAPSHOT_HEADER = "=8sII4q8s"
+
+def saveGraphSnapshot(g, filename):
+    """Writes the graph g, which may be a CSRGraph, to a snapshot file."""
+    if not isinstance(g, CSRGraph):
+        g = g.freeze()
+    names = [ ]
+    options = [ ]
+    nameOffsets = [ 0 ]
+    optionOffsets = [ 0 ]
+    nameSize = 0
+    optionSize = 0
+    for node in g.getNodes():
+        name = node.getName().encode("utf-8")
+        option = node.formatOptions()
+        option = b"" if option is None else option.encode("utf-8")
+        names.append(name)
+        options.append(option)
+        nameSize += len(name)
+        optionSize += len(option)
+        nameOffsets.append(nameSize)
+        optionOffsets.append(optionSize)
+    n = len(g)
+    m = g.getArcCount()
+    costType = g.getCosts().format.encode("ascii")
+    with open(filename, "wb") as f:
+        f.write(struct.pack(SNAPSHOT_HEADER, SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                            SNAPSHOT_MARKER, n, m, nameSize, optionSize,
+                            costType))
+        f.write(struct.pack(str(n + 1) + "q", *nameOffsets))
+        f.write(struct.pack(str(n + 1) + "q", *optionOffsets))
+        f.write(g.getOffsets().tobytes())
+        f.write(g.getTargets().tobytes())
+        f.write(g.getCosts().tobytes())
+        f.write(b"".join(names))
+        f.write(b"".join(options))
+
+def loadGraphSnapshot(filename, g=None, factory=Graph):
+    """
+    Reads a snapshot file.  If g is None, loadGraphSnapshot returns
+    a CSRGraph whose arrays refer directly to the memory-mapped file
+    and whose nodes are created by the graph class factory.
+    Otherwise, it adds the nodes and arcs to the graph g, creating
+    them with its factory methods, and returns g.
+    """
+    with open(filename, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    data = memoryview(mapping)
+    arrays = [ ]
+    try:
+        header = struct.calcsize(SNAPSHOT_HEADER)
+        magic, version, marker, n, m, nameSize, optionSize, costType = \
+            struct.unpack(SNAPSHOT_HEADER, data[:header])
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Not a graph snapshot: " + filename)
+        if marker != SNAPSHOT_MARKER:
+            raise ValueError("Snapshot has the wrong byte order: " + filename)
+        costType = costType.rstrip(b"\0").decode("ascii")
+        if costType not in [ "q", "d" ]:
+            raise ValueError("Snapshot has an illegal cost type: " + filename)
+        p = header
+        for typecode, count in [ ("q", n + 1), ("q", n + 1), ("q", n + 1),
+                                 ("q", m), (costType, m) ]:
+            arrays.append(data[p:p + 8 * count].cast(typecode))
+            p += 8 * count
+        nameOffsets, optionOffsets, offsets, targets, costs = arrays
+        nameData = bytes(data[p:p + nameSize])
+        optionData = bytes(data[p + nameSize:p + nameSize + optionSize])
+        names = [ ]
+        options = [ ]
+        for i in range(n):
+            name = nameData[nameOffsets[i]:nameOffsets[i + 1]]
+            names.append(name.decode("utf-8"))
+            option = optionData[optionOffsets[i]:optionOffsets[i + 1]]
+            options.append(option.decode("utf-8") if len(option) > 0 else None)
+        if g is None:
+            nodes = [ ]
+            creator = factory()
+            for name, option in zip(names, options):
+                node = creator.createNode(name)
+                if option is not None:
+                    node.scanOptions(option)
+                nodes.append(node)
+            result = CSRGraph(nodes, offsets, targets, costs)
+            arrays = None
+            return result
+        nodes = [ g.addNode(name) for name in names ]
+        for node, option in zip(nodes, options):
+            if option is not None:
+                node.scanOptions(option)
+        for i in range(n):
+            for k in range(offsets[i], offsets[i + 1]):
+                cost = costs[k]
+                if costType == "d" and cost.is_integer():
+                    cost = int(cost)
+                arc = g.addArc(nodes[i], nodes[targets[k]])
+                arc.setCost(cost)
+        return g
+    finally:
+        if arrays is not None:
+            for view in arrays:
+                view.release()
+            data.release()
+            mapping.close()
+
+def isGraphSnapshot(filename):
+    """Returns True if the file begins with the snapshot magic number."""
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+    except OSError:
+        return False
+
 # Implementation notes: Traversal functions
 # -----------------------------------------
 # The two standard traversal functions, dfs and bfs, take callback
 # functions that are applied to the node.  In each case, however,
 # the implementation uses inspection to determine whether the
 # callback function requires additional keyword parameters that
-# are appropriate to that traversal.
+# are appropriate to that traversal.  The inspection is done once
+# at the start of each traversal rather than on every visit.
 
-def dfs(start, fn=None, finish=None):
+def dfs(start, fn=None, finish=None, graph=None):
     """
     Conducts a depth-first search of the graph, beginning at start.
     If fn is supplied, it is called on each node as it is visited.
@@ -100,40 +328,82 @@ def dfs(start, fn=None, finish=None):
     takes a parameter named "timestamp"; if so, that parameter
     is passed as a keyword argument.
     """
-    def innerDFS(node):
-        nonlocal t
-        if node not in visited:
-            t = t + 1
-            if fn is not None:
-                kwargs = { }
-                if hasNamedParameter(fn, "timestamp"):
-                    kwargs["timestamp"] = t
-                fn(node, **kwargs)
-            visited.add(node)
-            for arc in node.getArcs():
-                innerDFS(arc.getFinish())
-            t = t + 1
-            if finish is not None:
-                kwargs = { }
-                if hasNamedParameter(finish, "timestamp"):
-                    kwargs["timestamp"] = t
-                finish(node, **kwargs)
+    def successors(node):
+        return (arc.getFinish() for arc in node.getArcs())
+    if graph is not None:
+        csrDFS(graph, [ graph.indexOf(start) ], fn, finish)
+    elif isinstance(start, CSRGraph):
+        csrDFS(start, range(len(start)), fn, finish)
+    elif isinstance(start, Node):
+        iterativeDFS([ start ], successors, fn, finish)
+    elif isinstance(start, Graph):
+        iterativeDFS(start.getNodes(), successors, fn, finish)
+
+# Implementation notes: iterativeDFS
+# ----------------------------------
+# The depth-first search is implemented using an explicit stack rather
+# than recursion, so that long paths do not exceed Python's recursion
+# limit.  Each stack entry holds a node together with an iterator over
+# its successors, which records how far the search has progressed in
+# that node's list.  The timestamps are incremented at exactly the same
+# points as in the recursive formulation in CLRS: once when a node is
+# discovered and once when all of its successors have been explored.
+
+def iterativeDFS(roots, successors, fn=None, finish=None, getNode=None):
+    """
+    Conducts a depth-first search from each unvisited node in roots,
+    where successors(node) returns an iterator over the nodes that
+    follow node.  If getNode is supplied, it is used to convert each
+    node into the value passed to the callback functions.
+    """
+    def notify(callback, useTimestamp, node):
+        if getNode is not None:
+            node = getNode(node)
+        if useTimestamp:
+            callback(node, timestamp=t)
+        else:
+            callback(node)
+    fnTimestamp = fn is not None and hasNamedParameter(fn, "timestamp")
+    finishTimestamp = (finish is not None and
+                       hasNamedParameter(finish, "timestamp"))
     visited = set()
     t = 0
-    if isinstance(start, Node):
-        innerDFS(start)
-    elif isinstance(start, Graph):
-        for node in start.getNodes():
-            innerDFS(node)
+    for root in roots:
+        if root in visited:
+            continue
+        t = t + 1
+        if fn is not None:
+            notify(fn, fnTimestamp, root)
+        visited.add(root)
+        stack = [ (root, successors(root)) ]
+        while len(stack) > 0:
+            node, children = stack[-1]
+            for child in children:
+                if child not in visited:
+                    t = t + 1
+                    if fn is not None:
+                        notify(fn, fnTimestamp, child)
+                    visited.add(child)
+                    stack.append((child, successors(child)))
+                    break
+            else:
+                stack.pop()
+                t = t + 1
+                if finish is not None:
+                    notify(finish, finishTimestamp, node)
 
 # Implementation note: bfs
 # ------------------------
 # The extra information for distance and predecessor described in CLRS
 # is maintained here in dictionaries indexed by node.  The reason for
 # doing so is to avoid having the bfs function make changes to the
-# Node objects, which are conceptually in the client's domain.
+# Node objects, which are conceptually in the client's domain.  The
+# queue is a deque so that removing the first node takes constant time.
+# The bfs function is implemented on top of bfsIter, which generates
+# the same information as a sequence of tuples for clients that want
+# to process the nodes in a loop or to stop the search early.
 
-def bfs(start, fn=None):
+def bfs(start, fn=None, graph=None):
     """
     Conducts a breadth-first search of the graph, beginning at start.
     If fn is supplied, it is called on each node as it is visited.
@@ -141,26 +411,86 @@ def bfs(start, fn=None):
     two others (distance and predecessor) are supplied as keyword
     parameters if the callback function defines them.
     """
-    visited = { start }
-    queue = [ start ]
+    if fn is None:
+        for node, distance, predecessor in bfsIter(start, graph):
+            pass
+        return
+    useDistance = hasNamedParameter(fn, "distance")
+    usePredecessor = hasNamedParameter(fn, "predecessor")
+    for node, distance, predecessor in bfsIter(start, graph):
+        kwargs = { }
+        if useDistance:
+            kwargs["distance"] = distance
+        if usePredecessor:
+            kwargs["predecessor"] = predecessor
+        fn(node, **kwargs)
+
+def bfsIter(start, graph=None):
+    """
+    Returns a generator that conducts a breadth-first search beginning
+    at start and produces a tuple (node, distance, predecessor) for
+    each node in the order in which it is visited.  The search advances
+    only as the tuples are requested, so a client can stop it early.
+    """
+    if graph is not None:
+        return csrBFSIter(graph, graph.indexOf(start))
+    return graphBFSIter(start)
+
+def graphBFSIter(start):
+    """Implements bfsIter for a start node in a Graph."""
+    queue = deque([ start ])
     distances = { start: 0 }
     predecessors = { start: None }
     while len(queue) > 0:
-        node = queue.pop(0)
-        if fn is not None:
-            kwargs = { }
-            if hasNamedParameter(fn, "distance"):
-                kwargs["distance"] = distances[node]
-            if hasNamedParameter(fn, "predecessor"):
-                kwargs["predecessor"] = predecessors[node]
-            fn(node, **kwargs)
+        node = queue.popleft()
+        distance = distances[node]
+        yield (node, distance, predecessors[node])
         for arc in node.getArcs():
             finish = arc.getFinish()
-            if finish not in visited:
-                distances[finish] = distances[node] + 1
+            if finish not in distances:
+                distances[finish] = distance + 1
                 predecessors[finish] = node
                 queue.append(finish)
-                visited.add(finish)
+
+# Implementation notes: CSR traversals
+# ------------------------------------
+# The functions csrDFS and csrBFSIter implement the same traversals
+# over the integer node indices of a CSRGraph.  Distances and
+# predecessors are kept in lists indexed by node, and the Node objects
+# are looked up only when they are passed back to the client, so that
+# clients see the same values as in the Graph versions.
+
+def csrDFS(g, roots, fn=None, finish=None):
+    """Conducts a depth-first search of a CSRGraph from each root index."""
+    def successors(index):
+        return iter(targets[offsets[index]:offsets[index + 1]])
+    offsets = g.getOffsets()
+    targets = g.getTargets()
+    iterativeDFS(roots, successors, fn, finish, g.getNode)
+
+def csrBFSIter(g, start):
+    """Implements bfsIter for a start index in a CSRGraph."""
+    offsets = g.getOffsets()
+    targets = g.getTargets()
+    distances = [ -1 ] * len(g)
+    predecessors = [ -1 ] * len(g)
+    distances[start] = 0
+    queue = deque([ start ])
+    while len(queue) > 0:
+        index = queue.popleft()
+        distance = distances[index]
+        predecessor = predecessors[index]
+        if predecessor >= 0:
+            predecessor = g.getNode(predecessor)
+        else:
+            predecessor = None
+        yield (g.getNode(index), distance, predecessor)
+        for k in range(offsets[index], offsets[index + 1]):
+            finish = targets[k]
+            if distances[finish] < 0:
+                distances[finish] = distance + 1
+                predecessors[finish] = index
+                queue.append(finish)
 
 def hasNamedParameter(fn, name):
     try: